@@ -3,7 +3,8 @@ from calculations.daily import calc_daily_analytics
 from calculations.historical import calc_historical
 from calculations.location import calc_location_and_user_agent
 from calculations.reoccurring import calc_reoccurring
-from calculations.room_stats import calc_room_stats
+from calculations.room_stats import calc_room_stats, calc_rooms_stats
+from calculations.timeseries import calc_timeseries
 from calculations.traffic import calc_traffic
 from calculations.votes import calc_votes
 
@@ -15,5 +16,7 @@ __all__ = [
     "calc_historical",
     "calc_location_and_user_agent",
     "calc_room_stats",
+    "calc_rooms_stats",
     "calc_daily_analytics",
+    "calc_timeseries",
 ]
@@ -1,12 +1,12 @@
 """Behaviour analytics calculation using Polars."""
 
 import re
-from pathlib import Path
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR
+from calculations.plan import Plan, collect_plan
+from util.table_store import lazy_table
 
 TOP_N = 40
 
@@ -33,28 +33,46 @@ def extract_sources(
     return updated_sources
 
 
-def calc_behaviour() -> dict[str, Any]:
-    """Calculate behaviour analytics from Parquet files."""
-    data_dir = Path(DATA_DIR)
-
+def plan_behaviour() -> Plan:
+    """Lazy queries for the behaviour analytics."""
     # Load page view data
-    df_page_views = pl.read_parquet(
-        data_dir / "fpp_page_views.parquet", columns=["route", "source", "room_id"]
-    )
+    lf_page_views = lazy_table("fpp_page_views").select(["route", "source"])
 
-    # Amount of page views for each route
-    routes = dict(df_page_views.group_by("route").len().sort("route").iter_rows())
+    # Load vote and room data for room popularity
+    lf_votes = lazy_table("fpp_votes").select(["room_id"])
+    lf_rooms = lazy_table("fpp_rooms")
+
+    # Ensure id column exists for join
+    if "id" not in lf_rooms.collect_schema().names():
+        # If fpp_rooms uses index as id, reset it
+        lf_rooms = lf_rooms.with_row_index("id")
 
-    # Amount of each source (filter out nulls)
-    sources_raw = dict(
-        df_page_views.filter(pl.col("source").is_not_null())
+    # Join votes and rooms
+    lf_votes_with_rooms = lf_votes.join(
+        lf_rooms.select(["id", "name"]), left_on="room_id", right_on="id", how="left"
+    )
+
+    return {
+        # Amount of page views for each route
+        "routes": lf_page_views.group_by("route").len().sort("route"),
+        # Amount of each source (filter out nulls)
+        "sources": lf_page_views.filter(pl.col("source").is_not_null())
         .group_by("source")
+        .len(),
+        # Amount of events for each event
+        "events": lazy_table("fpp_events").group_by("event").len(),
+        # Amount of votes for each room (top N by count)
+        "rooms": lf_votes_with_rooms.group_by("name")
         .len()
-        .iter_rows()
-    )
+        .sort("len", descending=True)
+        .head(TOP_N),
+    }
+
 
+def finish_behaviour(frames: dict[str, pl.DataFrame]) -> dict[str, Any]:
+    """Behaviour analytics from the collected queries."""
     sources = extract_sources(
-        sources_raw,
+        dict(frames["sources"].iter_rows()),
         [
             ["Teams", r"teams\."],
             ["Google Ads", r"ads\.|google_ads"],
@@ -67,34 +85,14 @@ def calc_behaviour() -> dict[str, Any]:
         ],
     )
 
-    # Load event data
-    df_events = pl.read_parquet(data_dir / "fpp_events.parquet", columns=["event"])
+    return {
+        "routes": dict(frames["routes"].iter_rows()),
+        "sources": sources,
+        "events": dict(frames["events"].iter_rows()),
+        "rooms": dict(frames["rooms"].iter_rows()),
+    }
 
-    # Amount of events for each event
-    events = dict(df_events.group_by("event").len().iter_rows())
 
-    # Load vote and room data for room popularity
-    df_votes = pl.read_parquet(data_dir / "fpp_votes.parquet", columns=["room_id"])
-
-    df_rooms = pl.read_parquet(data_dir / "fpp_rooms.parquet")
-
-    # Ensure id column exists for join
-    if "id" not in df_rooms.columns:
-        # If fpp_rooms uses index as id, reset it
-        df_rooms = df_rooms.with_row_index("id")
-
-    # Join votes and rooms
-    df_votes_with_rooms = df_votes.join(
-        df_rooms.select(["id", "name"]), left_on="room_id", right_on="id", how="left"
-    )
-
-    # Amount of votes for each room (top N by count)
-    rooms = dict(
-        df_votes_with_rooms.group_by("name")
-        .len()
-        .sort("len", descending=True)
-        .head(TOP_N)
-        .iter_rows()
-    )
-
-    return {"routes": routes, "sources": sources, "events": events, "rooms": rooms}
+def calc_behaviour() -> dict[str, Any]:
+    """Calculate behaviour analytics from Parquet files."""
+    return finish_behaviour(collect_plan(plan_behaviour()))
@@ -1,46 +1,54 @@
 """Daily analytics for email reports using Polars."""
 
 from datetime import datetime, timedelta
-from pathlib import Path
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR
-
-
-def calc_daily_analytics() -> dict[str, Any]:
-    """Calculate last 24 hours analytics for daily email."""
-    data_dir = Path(DATA_DIR)
-    yesterday = datetime.now() - timedelta(days=1)
-
-    # Load votes data filtered to last 24 hours
-    df_votes = pl.read_parquet(data_dir / "fpp_votes.parquet")
-    votes = df_votes.filter(pl.col("voted_at") > yesterday)
-
-    # Count of votes
-    total_votes = votes.height
-
-    # Count of estimations
-    estimations = int(votes["amount_of_estimations"].sum() or 0)
-
-    # Amount of different rooms
-    rooms = votes["room_id"].n_unique()
-
-    # Load page view data filtered to last 24 hours
-    df_page_views = pl.read_parquet(data_dir / "fpp_page_views.parquet")
-    page_views_filtered = df_page_views.filter(pl.col("viewed_at") > yesterday)
-
-    # Count unique users
-    unique_users = page_views_filtered["user_id"].n_unique()
-
-    # Count total page views
-    page_views = page_views_filtered.height
+from util.storage import scan_table_range
+
+
+def calc_daily_analytics(
+    start: datetime | None = None, end: datetime | None = None
+) -> dict[str, Any]:
+    """Calculate analytics for [start, end); by default the last 24 hours.
+
+    Only the partitions, row groups and columns of the window are read.
+    """
+    if start is None:
+        start = datetime.now() - timedelta(days=1)
+
+    # Votes in the window
+    votes = scan_table_range("fpp_votes", start, end).select(
+        [
+            # Count of votes
+            pl.len().alias("votes"),
+            # Count of estimations
+            pl.col("amount_of_estimations").sum().alias("estimations"),
+            # Amount of different rooms
+            pl.col("room_id").n_unique().alias("rooms"),
+        ]
+    )
+
+    # Page views in the window
+    page_views = scan_table_range("fpp_page_views", start, end).select(
+        [
+            # Count unique users
+            pl.col("user_id").n_unique().alias("unique_users"),
+            # Count total page views
+            pl.len().alias("page_views"),
+        ]
+    )
+
+    # Both scans in one parallel query
+    votes_df, page_views_df = pl.collect_all([votes, page_views])
+    votes_row = votes_df.row(0, named=True)
+    page_views_row = page_views_df.row(0, named=True)
 
     return {
-        "votes": total_votes,
-        "estimations": estimations,
-        "rooms": rooms,
-        "unique_users": unique_users,
-        "page_views": page_views,
+        "votes": votes_row["votes"],
+        "estimations": int(votes_row["estimations"] or 0),
+        "rooms": votes_row["rooms"],
+        "unique_users": page_views_row["unique_users"],
+        "page_views": page_views_row["page_views"],
     }
@@ -1,148 +1,122 @@
 """Historical analytics with moving averages using Polars."""
 
-from datetime import datetime, timedelta
-from pathlib import Path
+import threading
+from datetime import datetime
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR, START_DATE
+from calculations.plan import Plan, collect_plan
+from config import START_DATE
+from util.rollups import read_daily_rollup
 
+# Table -> name of its daily count in the series
+HISTORICAL_COUNTS = {
+    "fpp_users": "new_users",
+    "fpp_page_views": "page_views",
+    "fpp_rooms": "rooms",
+    "fpp_estimations": "estimations",
+    "fpp_votes": "votes",
+}
 
-def calc_historical() -> list[dict[str, Any]]:
-    """Calculate historical daily metrics with moving averages."""
-    data_dir = Path(DATA_DIR)
+# Moving average window in (week)days, and the order of the ma_* fields
+WINDOW_SIZE = 30
+MOVING_AVERAGES = ["new_users", "page_views", "votes", "rooms", "estimations"]
 
-    # Load all necessary data
-    df_users = pl.read_parquet(data_dir / "fpp_users.parquet", columns=["created_at"])
-    df_page_views = pl.read_parquet(
-        data_dir / "fpp_page_views.parquet", columns=["viewed_at"]
-    )
-    df_rooms = pl.read_parquet(
-        data_dir / "fpp_rooms.parquet", columns=["first_used_at"]
-    )
-    df_estimations = pl.read_parquet(
-        data_dir / "fpp_estimations.parquet", columns=["estimated_at"]
-    )
-    df_votes = pl.read_parquet(data_dir / "fpp_votes.parquet", columns=["voted_at"])
+# Previous daily counts and result, so a refresh only recomputes changed days
+_state: dict[str, Any] = {"counts": None, "rows": []}
+_state_lock = threading.Lock()
 
-    # Create date range
+
+def plan_historical() -> Plan:
+    """Per-day row counts from the rollups maintained by the updater."""
+    return {
+        table: read_daily_rollup(table).lazy().select(["day", "rows"])
+        for table in HISTORICAL_COUNTS
+    }
+
+
+def _daily_counts(frames: dict[str, pl.DataFrame]) -> pl.DataFrame:
+    """Counts per weekday from START_DATE to today, 0 for days without rows."""
     start_date = datetime.strptime(START_DATE, "%Y-%m-%d").date()
     end_date = datetime.now().date()
 
-    historical = []
-    acc_new_users = 0
-    acc_page_views = 0
-    acc_rooms = 0
-    acc_estimations = 0
-    acc_votes = 0
-
-    current_date = start_date
-    while current_date <= end_date:
-        # Skip Saturday (5) and Sunday (6)
-        if current_date.weekday() in [5, 6]:
-            current_date += timedelta(days=1)
-            continue
-
-        # Count metrics for this date
-        new_users = df_users.filter(
-            pl.col("created_at").dt.date() == current_date
-        ).height
-        acc_new_users += new_users
-
-        page_views = df_page_views.filter(
-            pl.col("viewed_at").dt.date() == current_date
-        ).height
-        acc_page_views += page_views
-
-        rooms = df_rooms.filter(
-            pl.col("first_used_at").dt.date() == current_date
-        ).height
-        acc_rooms += rooms
-
-        estimations = df_estimations.filter(
-            pl.col("estimated_at").dt.date() == current_date
-        ).height
-        acc_estimations += estimations
-
-        votes = df_votes.filter(pl.col("voted_at").dt.date() == current_date).height
-        acc_votes += votes
-
-        historical.append(
-            {
-                "date": current_date.isoformat(),
-                "new_users": new_users,
-                "acc_new_users": acc_new_users,
-                "page_views": page_views,
-                "acc_page_views": acc_page_views,
-                "rooms": rooms,
-                "acc_rooms": acc_rooms,
-                "estimations": estimations,
-                "acc_estimations": acc_estimations,
-                "votes": votes,
-                "acc_votes": acc_votes,
-                "ma_new_users": None,
-                "ma_page_views": None,
-                "ma_votes": None,
-                "ma_rooms": None,
-                "ma_estimations": None,
-            }
-        )
-
-        current_date += timedelta(days=1)
-
-    # Calculate moving averages using Polars
-    df_historical = pl.DataFrame(historical)
-    window_size = 30
-
-    df_historical = df_historical.with_columns(
-        [
-            pl.col("new_users")
-            .rolling_mean(window_size=window_size)
-            .alias("ma_new_users"),
-            pl.col("page_views")
-            .rolling_mean(window_size=window_size)
-            .alias("ma_page_views"),
-            pl.col("votes").rolling_mean(window_size=window_size).alias("ma_votes"),
-            pl.col("rooms").rolling_mean(window_size=window_size).alias("ma_rooms"),
-            pl.col("estimations")
-            .rolling_mean(window_size=window_size)
-            .alias("ma_estimations"),
-        ]
+    # Weekday calendar (Saturday and Sunday skipped)
+    counts = pl.DataFrame(
+        {"day": pl.date_range(start_date, end_date, "1d", eager=True)}
+    ).filter(pl.col("day").dt.weekday() <= 5)
+    for table, name in HISTORICAL_COUNTS.items():
+        counts = counts.join(frames[table].rename({"rows": name}), on="day", how="left")
+    return counts.with_columns(
+        pl.col(list(HISTORICAL_COUNTS.values())).fill_null(0).cast(pl.Int64)
+    )
+
+
+def _historical_rows(
+    counts: pl.DataFrame, offsets: dict[str, int]
+) -> list[dict[str, Any]]:
+    """Series rows with running totals (starting at offsets) and moving averages."""
+    df = counts.select(
+        pl.col("day").dt.to_string("%Y-%m-%d").alias("date"),
+        *(
+            expr
+            for name in HISTORICAL_COUNTS.values()
+            for expr in (
+                pl.col(name),
+                (pl.col(name).cum_sum() + offsets[name]).alias(f"acc_{name}"),
+            )
+        ),
+        *(
+            pl.col(name)
+            .rolling_mean(window_size=WINDOW_SIZE)
+            .round(2)
+            .alias(f"ma_{name}")
+            for name in MOVING_AVERAGES
+        ),
+    )
+    return df.to_dicts()
+
+
+def _first_changed_day(previous: pl.DataFrame | None, counts: pl.DataFrame) -> int:
+    """Index of the first day whose counts differ from the previous refresh."""
+    if previous is None:
+        return 0
+    common = min(previous.height, counts.height)
+    changed = (
+        (previous.head(common) != counts.head(common))
+        .select(pl.any_horizontal(pl.all()))
+        .to_series()
+        .arg_true()
     )
+    return int(changed[0]) if len(changed) else common
+
+
+def finish_historical(frames: dict[str, pl.DataFrame]) -> list[dict[str, Any]]:
+    """Historical daily metrics with moving averages from the daily counts.
+
+    Days before the first changed day are reused from the previous refresh;
+    the rest is recomputed from that day's running totals and the preceding
+    moving average window.
+    """
+    counts = _daily_counts(frames)
+    with _state_lock:
+        previous, previous_rows = _state["counts"], _state["rows"]
 
-    # Convert back to list of dicts with rounded values
-    result = []
-    for row in df_historical.iter_rows(named=True):
-        result.append(
-            {
-                "date": row["date"],
-                "new_users": row["new_users"],
-                "acc_new_users": row["acc_new_users"],
-                "page_views": row["page_views"],
-                "acc_page_views": row["acc_page_views"],
-                "rooms": row["rooms"],
-                "acc_rooms": row["acc_rooms"],
-                "estimations": row["estimations"],
-                "acc_estimations": row["acc_estimations"],
-                "votes": row["votes"],
-                "acc_votes": row["acc_votes"],
-                "ma_new_users": round(row["ma_new_users"], 2)
-                if row["ma_new_users"] is not None
-                else None,
-                "ma_page_views": round(row["ma_page_views"], 2)
-                if row["ma_page_views"] is not None
-                else None,
-                "ma_votes": round(row["ma_votes"], 2)
-                if row["ma_votes"] is not None
-                else None,
-                "ma_rooms": round(row["ma_rooms"], 2)
-                if row["ma_rooms"] is not None
-                else None,
-                "ma_estimations": round(row["ma_estimations"], 2)
-                if row["ma_estimations"] is not None
-                else None,
-            }
-        )
-
-    return result
+    first = _first_changed_day(previous, counts)
+    rows: list[dict[str, Any]] = previous_rows[:first]
+    if first < counts.height:
+        start = max(0, first - (WINDOW_SIZE - 1))
+        offsets = {
+            name: previous_rows[start - 1][f"acc_{name}"] if start else 0
+            for name in HISTORICAL_COUNTS.values()
+        }
+        rows = rows + _historical_rows(counts.slice(start), offsets)[first - start :]
+
+    with _state_lock:
+        _state["counts"], _state["rows"] = counts, rows
+    return rows
+
+
+def calc_historical() -> list[dict[str, Any]]:
+    """Calculate historical daily metrics with moving averages."""
+    return finish_historical(collect_plan(plan_historical()))
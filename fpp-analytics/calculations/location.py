@@ -1,68 +1,59 @@
 """Location and user agent analytics using Polars."""
 
-from pathlib import Path
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR
+from calculations.plan import Plan, collect_plan
+from util.table_store import lazy_table
 
 TOP_N = 40
 
 
-def calc_location_and_user_agent() -> dict[str, Any]:
-    """Calculate location and user agent breakdown."""
-    data_dir = Path(DATA_DIR)
-
+def plan_location_and_user_agent() -> Plan:
+    """Lazy queries for the location and user agent breakdown."""
     # Load user data
-    df_users = pl.read_parquet(
-        data_dir / "fpp_users.parquet",
-        columns=["device", "os", "browser", "country", "region", "city"],
+    lf_users = lazy_table("fpp_users").select(
+        ["device", "os", "browser", "country", "region", "city"]
     )
 
-    # Device breakdown
-    device = dict(df_users.group_by("device").len().iter_rows())
-
-    # OS breakdown
-    operating_system = dict(df_users.group_by("os").len().iter_rows())
-
-    # Browser breakdown
-    browser = dict(df_users.group_by("browser").len().iter_rows())
-
-    # Country breakdown (top N by count)
-    country = dict(
-        df_users.group_by("country")
+    return {
+        # Device, OS and browser breakdown
+        "device": lf_users.group_by("device").len(),
+        "os": lf_users.group_by("os").len(),
+        "browser": lf_users.group_by("browser").len(),
+        # Country breakdown (top N by count)
+        "country": lf_users.group_by("country")
         .len()
         .sort("len", descending=True)
-        .head(TOP_N)
-        .iter_rows()
-    )
-
-    # Country-region breakdown (top N by count)
-    country_region = (
-        df_users.group_by(["country", "region"])
+        .head(TOP_N),
+        # Country-region breakdown (top N by count)
+        "country_region": lf_users.group_by(["country", "region"])
         .len()
         .rename({"len": "count"})
         .sort("count", descending=True)
-        .head(TOP_N)
-        .to_dicts()
-    )
-
-    # Country-city breakdown (top N by count)
-    country_city = (
-        df_users.group_by(["country", "city"])
+        .head(TOP_N),
+        # Country-city breakdown (top N by count)
+        "country_city": lf_users.group_by(["country", "city"])
         .len()
         .rename({"len": "count"})
         .sort("count", descending=True)
-        .head(TOP_N)
-        .to_dicts()
-    )
+        .head(TOP_N),
+    }
+
 
+def finish_location_and_user_agent(frames: dict[str, pl.DataFrame]) -> dict[str, Any]:
+    """Location and user agent breakdown from the collected queries."""
     return {
-        "device": device,
-        "os": operating_system,
-        "browser": browser,
-        "country": country,
-        "country_region": country_region,
-        "country_city": country_city,
+        "device": dict(frames["device"].iter_rows()),
+        "os": dict(frames["os"].iter_rows()),
+        "browser": dict(frames["browser"].iter_rows()),
+        "country": dict(frames["country"].iter_rows()),
+        "country_region": frames["country_region"].to_dicts(),
+        "country_city": frames["country_city"].to_dicts(),
     }
+
+
+def calc_location_and_user_agent() -> dict[str, Any]:
+    """Calculate location and user agent breakdown."""
+    return finish_location_and_user_agent(collect_plan(plan_location_and_user_agent()))
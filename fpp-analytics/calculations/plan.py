@@ -0,0 +1,33 @@
+"""Fused execution of calculations as one Polars query plan.
+
+Dashboard calculations are split into `plan_*` (named LazyFrames) and
+`finish_*` (Python post-processing of the collected, small results). Collecting
+the plans of several sections with a single `pl.collect_all` lets Polars
+eliminate common subplans (the same table read by several sections), push
+projections down and run the queries of all sections in parallel.
+"""
+
+import polars as pl
+
+Plan = dict[str, pl.LazyFrame]
+
+
+def collect_plan(plan: Plan) -> dict[str, pl.DataFrame]:
+    """Collect the frames of one plan together."""
+    return dict(zip(plan, pl.collect_all(plan.values()), strict=True))
+
+
+def collect_plans(plans: dict[str, Plan]) -> dict[str, dict[str, pl.DataFrame]]:
+    """Collect the frames of several plans in one fused query."""
+    keys = [(section, name) for section, plan in plans.items() for name in plan]
+    frames = pl.collect_all([plans[section][name] for section, name in keys])
+
+    collected: dict[str, dict[str, pl.DataFrame]] = {section: {} for section in plans}
+    for (section, name), df in zip(keys, frames, strict=True):
+        collected[section][name] = df
+    return collected
+
+
+def explain_plans(plans: dict[str, Plan]) -> str:
+    """Return the combined optimized plan of several plans (for debugging)."""
+    return pl.explain_all([lf for plan in plans.values() for lf in plan.values()])
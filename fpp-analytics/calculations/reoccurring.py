@@ -1,93 +1,194 @@
-"""Reoccurring users and rooms time series using Polars."""
+"""Reoccurring users and rooms time series using Polars.
 
+A user (room) is reoccurring from the second weekday it was active on, and
+"adjusted" reoccurring on days at most 30 days after its last active day. Both
+series are computed in one sweep: each active day after the first covers the
+days until 30 days later or the next active day, whichever comes first, so the
+adjusted count of a day is the number of intervals covering it.
+"""
+
+import threading
 from datetime import date, datetime, timedelta
-from pathlib import Path
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR, START_DATE
+from calculations.plan import Plan, collect_plan
+from config import REOCCURRING_INCREMENTAL, START_DATE
+from util.table_store import lazy_table
+
+# Days after the last activity an entity still counts as adjusted reoccurring
+ACTIVE_DAYS = 30
+
+ENTITIES = {"users": "user_id", "rooms": "room_id"}
 
+# Folded state for REOCCURRING_INCREMENTAL: per entity its first, second and
+# last active day up to `through` (the day before the last refresh), the series
+# rows up to that day and the number of estimations it was built from
+_state: dict[str, Any] = {"through": None, "rows_before": None}
+_state_lock = threading.Lock()
+
+
+def _date_range() -> tuple[date, date]:
+    """Days covered by the series: START_DATE up to today."""
+    start_date = datetime.strptime(START_DATE, "%Y-%m-%d").date()
+    return start_date, datetime.now().date()
 
-def calc_reoccurring() -> list[dict[str, Any]]:
-    """Calculate reoccurring users and rooms time series."""
-    data_dir = Path(DATA_DIR)
+
+def plan_reoccurring() -> Plan:
+    """Lazy queries for the reoccurring users and rooms time series.
+
+    Per entity the distinct weekdays it was active on; with a folded state
+    only the days after it.
+    """
+    start_date, end_date = _date_range()
+    with _state_lock:
+        through = _state["through"] if REOCCURRING_INCREMENTAL else None
+    after = through or start_date - timedelta(days=1)
 
     # Load estimation data
-    df_estimations = pl.read_parquet(
-        data_dir / "fpp_estimations.parquet",
-        columns=["user_id", "room_id", "estimated_at"],
+    lf = lazy_table("fpp_estimations").with_columns(
+        pl.col("estimated_at").dt.date().alias("day")
+    )
+    active = lf.filter(
+        pl.col("day").is_between(start_date, end_date),
+        # Skip Saturday (6) and Sunday (7)
+        pl.col("day").dt.weekday() <= 5,
+        pl.col("day") > after,
     )
+    plan: Plan = {
+        kind: active.select([pl.col(column).alias("entity"), "day"]).unique()
+        for kind, column in ENTITIES.items()
+    }
+    # Estimations behind the folded state, and behind the next one
+    plan["state"] = lf.select(
+        pl.lit(through, dtype=pl.Date).alias("through"),
+        (pl.col("day") <= after).sum().alias("rows_before"),
+        (pl.col("day") < end_date).sum().alias("rows_through"),
+    )
+    return plan
 
-    # Create date range from START_DATE to today
-    start_date = datetime.strptime(START_DATE, "%Y-%m-%d").date()
-    end_date = datetime.now().date()
-
-    reoccurring: list[dict[str, str | int]] = []
-    users: set[str] = set()
-    rooms: set[int] = set()
-    accounted_users: set[str] = set()
-    accounted_rooms: set[int] = set()
-    last_active_user: dict[str, date] = {}
-    last_active_room: dict[int, date] = {}
-
-    current_date = start_date
-    while current_date <= end_date:
-        # Skip Saturday (5) and Sunday (6)
-        if current_date.weekday() in [5, 6]:
-            current_date += timedelta(days=1)
-            continue
-
-        # Filter estimations for this date
-        day_estimations = df_estimations.filter(
-            pl.col("estimated_at").dt.date() == current_date
-        )
 
-        new_users = day_estimations["user_id"].unique().to_list()
-        new_rooms = day_estimations["room_id"].unique().to_list()
-
-        # Update last active date for users
-        for user in new_users:
-            last_active_user[user] = current_date
-            if user not in users:
-                users.add(user)
-            elif user not in accounted_users:
-                accounted_users.add(user)
-
-        # Update last active date for rooms
-        for room in new_rooms:
-            last_active_room[room] = current_date
-            if room not in rooms:
-                rooms.add(room)
-            elif room not in accounted_rooms:
-                accounted_rooms.add(room)
-
-        # Calculate reoccurring counts
-        reoccurring_users = len(accounted_users)
-        reoccurring_rooms = len(accounted_rooms)
-
-        # Calculate adjusted (active within last 30 days)
-        adjusted_reoccurring_users = sum(
-            1
-            for user in accounted_users
-            if (current_date - last_active_user[user]).days <= 30
+def _sweep(active: pl.DataFrame, start_date: date, end_date: date) -> pl.DataFrame:
+    """Reoccurring and adjusted reoccurring counts per calendar day."""
+    active = active.sort(["entity", "day"]).with_columns(
+        pl.int_range(pl.len()).over("entity").alias("nth"),
+        pl.col("day").shift(-1).over("entity").alias("next_day"),
+    )
+    # Reoccurring from the second active day on
+    second = (
+        active.filter(pl.col("nth") == 1)
+        .group_by("day")
+        .agg(pl.len().cast(pl.Int64).alias("new"))
+    )
+    # Active days from the second on cover the following ACTIVE_DAYS days, up
+    # to the next active day (so an entity's intervals never overlap)
+    covered = active.filter(pl.col("nth") >= 1).select(
+        pl.col("day").alias("start"),
+        pl.min_horizontal(
+            pl.col("day") + timedelta(days=ACTIVE_DAYS),
+            pl.col("next_day") - timedelta(days=1),
+        ).alias("end"),
+    )
+    changes = (
+        pl.concat(
+            [
+                covered.select(pl.col("start").alias("day"), pl.lit(1).alias("change")),
+                covered.select(
+                    (pl.col("end") + timedelta(days=1)).alias("day"),
+                    pl.lit(-1).alias("change"),
+                ),
+            ]
         )
-        adjusted_reoccurring_rooms = sum(
-            1
-            for room in accounted_rooms
-            if (current_date - last_active_room[room]).days <= 30
+        .group_by("day")
+        .agg(pl.col("change").sum().cast(pl.Int64))
+    )
+    return (
+        pl.DataFrame({"day": pl.date_range(start_date, end_date, "1d", eager=True)})
+        .join(second, on="day", how="left")
+        .join(changes, on="day", how="left")
+        .select(
+            "day",
+            pl.col("new").fill_null(0).cum_sum().alias("reoccurring"),
+            pl.col("change").fill_null(0).cum_sum().alias("adjusted"),
         )
+    )
 
-        reoccurring.append(
-            {
-                "date": current_date.isoformat(),
-                "reoccurring_users": reoccurring_users,
-                "reoccurring_rooms": reoccurring_rooms,
-                "adjusted_reoccurring_users": adjusted_reoccurring_users,
-                "adjusted_reoccurring_rooms": adjusted_reoccurring_rooms,
-            }
-        )
 
-        current_date += timedelta(days=1)
+def _fold(active: pl.DataFrame, through: date) -> pl.DataFrame:
+    """Per entity the days that determine the series after `through`.
+
+    First and second active day (reoccurring since) and the last active day;
+    as active days they reproduce every count after `through`.
+    """
+    return (
+        active.filter(pl.col("day") <= through)
+        .sort(["entity", "day"])
+        .group_by("entity")
+        .agg(pl.col("day").head(2).append(pl.col("day").last()))
+        .explode("day")
+        .unique()
+    )
 
-    return reoccurring
+
+def finish_reoccurring(frames: dict[str, pl.DataFrame]) -> list[dict[str, Any]]:
+    """Reoccurring users and rooms time series from the active days."""
+    start_date, end_date = _date_range()
+    state_row = frames["state"].row(0, named=True)
+    through = state_row["through"]
+
+    # The folded state is only valid if it is the one the plan filtered by and
+    # no estimations were added (or removed) for days it covers
+    with _state_lock:
+        state = dict(_state)
+    if through is not None and (
+        state["through"] != through or state["rows_before"] != state_row["rows_before"]
+    ):
+        return calc_reoccurring(full=True)
+
+    series = {}
+    folded = {}
+    for kind in ENTITIES:
+        active = frames[kind]
+        if through is not None:
+            active = pl.concat([state[kind], active]).unique()
+        series[kind] = _sweep(active, start_date, end_date)
+        folded[kind] = _fold(active, end_date - timedelta(days=1))
+
+    df = (
+        series["users"]
+        .join(series["rooms"], on="day", suffix="_rooms")
+        .filter(pl.col("day").dt.weekday() <= 5)
+    )
+    if through is not None:
+        df = df.filter(pl.col("day") > through)
+    rows = (state["rows"] if through is not None else []) + df.select(
+        pl.col("day").dt.to_string("%Y-%m-%d").alias("date"),
+        pl.col("reoccurring").alias("reoccurring_users"),
+        pl.col("reoccurring_rooms"),
+        pl.col("adjusted").alias("adjusted_reoccurring_users"),
+        pl.col("adjusted_rooms").alias("adjusted_reoccurring_rooms"),
+    ).to_dicts()
+
+    if REOCCURRING_INCREMENTAL:
+        # Fold everything before today; today's estimations are still coming in
+        yesterday = end_date - timedelta(days=1)
+        with _state_lock:
+            _state.update(
+                folded,
+                through=yesterday,
+                rows_before=state_row["rows_through"],
+                rows=[row for row in rows if row["date"] <= yesterday.isoformat()],
+            )
+    return rows
+
+
+def calc_reoccurring(full: bool = False) -> list[dict[str, Any]]:
+    """Calculate reoccurring users and rooms time series.
+
+    `full` drops the folded state (REOCCURRING_INCREMENTAL) and starts over.
+    """
+    if full:
+        with _state_lock:
+            _state.update(through=None, rows_before=None)
+    return finish_reoccurring(collect_plan(plan_reoccurring()))
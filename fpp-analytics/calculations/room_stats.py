@@ -1,25 +1,91 @@
 """Per-room statistics calculation using Polars."""
 
-from pathlib import Path
+import threading
+from collections import OrderedDict
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR
+from config import ROOM_STATS_CACHE_SIZE
+from util.table_store import Version, lazy_table, lookup_rows, table_version
+
+# Aggregated metrics of a room's votes
+ROOM_METRICS = [
+    pl.col("duration").mean().alias("avg_duration"),
+    pl.col("amount_of_estimations").sum().alias("total_estimations"),
+    pl.col("min_estimation").mean().alias("avg_min"),
+    pl.col("avg_estimation").mean().alias("avg_avg"),
+    pl.col("max_estimation").mean().alias("avg_max"),
+    pl.col("amount_of_spectators").sum().alias("total_spectators"),
+]
+
+# {(room_id, votes version): stats} in least recently used order
+_stats_cache: OrderedDict[tuple[int, Version], dict[str, Any]] = OrderedDict()
+_stats_lock = threading.Lock()
 
 
 def calc_room_stats(room_id: int) -> dict[str, Any]:
-    """Calculate statistics for a specific room."""
-    data_dir = Path(DATA_DIR)
+    """Calculate statistics for a specific room (cached per votes version)."""
+    # The manifest identifies the version, so cache hits read no votes at all
+    version, _ = table_version("fpp_votes")
+    with _stats_lock:
+        if (room_id, version) in _stats_cache:
+            _stats_cache.move_to_end((room_id, version))
+            return _stats_cache[(room_id, version)]
+
+    # Only the room's votes are gathered, found via the room_id index; cached
+    # under the version they were read from, which may be newer
+    version, votes = lookup_rows("fpp_votes", "room_id", room_id)
+    key = (room_id, version)
+    stats = room_stats_from_votes(votes)
+
+    with _stats_lock:
+        _stats_cache[key] = stats
+        while len(_stats_cache) > ROOM_STATS_CACHE_SIZE:
+            _stats_cache.popitem(last=False)
+    return stats
+
+
+def room_stats_from_votes(votes: pl.DataFrame) -> dict[str, Any]:
+    """Statistics of one room from its votes."""
+    if votes.height == 0:
+        return _format_room_stats({"votes": 0})
+    return _format_room_stats(
+        votes.select([pl.len().alias("votes"), *ROOM_METRICS]).row(0, named=True)
+    )
+
 
-    # Load votes data filtered by room_id
-    df_votes = pl.read_parquet(data_dir / "fpp_votes.parquet")
+def calc_rooms_stats(
+    room_ids: list[int] | None = None, top: int | None = None
+) -> dict[int, dict[str, Any]]:
+    """Statistics of many rooms in one vectorized pass over the votes.
 
-    # Filter by room_id
-    votes = df_votes.filter(pl.col("room_id") == room_id)
+    Either the given rooms (in the given order, zeros for rooms without votes)
+    or the `top` rooms by number of votes.
+    """
+    lf = lazy_table("fpp_votes")
+    if room_ids is not None:
+        lf = lf.filter(pl.col("room_id").is_in(room_ids))
 
+    per_room = lf.group_by("room_id").agg([pl.len().alias("votes"), *ROOM_METRICS])
+    if top is not None:
+        per_room = per_room.sort(["votes", "room_id"], descending=[True, False]).head(
+            top
+        )
+
+    metrics = {row["room_id"]: row for row in per_room.collect().iter_rows(named=True)}
+    if room_ids is None:
+        return {room_id: _format_room_stats(row) for room_id, row in metrics.items()}
+    return {
+        room_id: _format_room_stats(metrics.get(room_id, {"votes": 0}))
+        for room_id in room_ids
+    }
+
+
+def _format_room_stats(metrics: dict[str, Any]) -> dict[str, Any]:
+    """Response fields from a room's aggregated metrics (see ROOM_METRICS)."""
     # Count of votes
-    total_votes = votes.height
+    total_votes = metrics["votes"]
 
     if total_votes == 0:
         return {
@@ -34,18 +100,6 @@ def calc_room_stats(room_id: int) -> dict[str, Any]:
             "spectators_per_vote": 0,
         }
 
-    # Aggregate metrics
-    metrics = votes.select(
-        [
-            pl.col("duration").mean().alias("avg_duration"),
-            pl.col("amount_of_estimations").sum().alias("total_estimations"),
-            pl.col("min_estimation").mean().alias("avg_min"),
-            pl.col("avg_estimation").mean().alias("avg_avg"),
-            pl.col("max_estimation").mean().alias("avg_max"),
-            pl.col("amount_of_spectators").sum().alias("total_spectators"),
-        ]
-    ).row(0, named=True)
-
     duration = round(metrics["avg_duration"] or 0, 0)
     estimations = int(metrics["total_estimations"] or 0)
     estimations_per_vote = round(estimations / total_votes, 2) if total_votes > 0 else 0
@@ -0,0 +1,142 @@
+"""Time-bucketed metric series using Polars."""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+import polars as pl
+
+from config import START_DATE, TIMESERIES_CACHE_SIZE
+from util.storage import TIME_COLUMNS, scan_table_range
+from util.table_store import table_version
+
+# Metric -> source table and the columns it can be filtered by
+METRICS: dict[str, dict[str, Any]] = {
+    "page_views": {
+        "table": "fpp_page_views",
+        "filters": ["route", "source", "room_id"],
+    },
+    "votes": {"table": "fpp_votes", "filters": ["room_id"]},
+    "estimations": {"table": "fpp_estimations", "filters": ["room_id"]},
+    "new_users": {
+        "table": "fpp_users",
+        "filters": ["device", "os", "browser", "country"],
+    },
+    "rooms": {"table": "fpp_rooms", "filters": []},
+    "events": {"table": "fpp_events", "filters": ["event"]},
+}
+
+# Granularity -> Polars duration (weeks start on Monday)
+GRANULARITIES = {"hour": "1h", "day": "1d", "week": "1w", "month": "1mo"}
+
+# Upper bound for buckets per series (about five years of hours)
+MAX_BUCKETS = 50_000
+
+_APPROX_BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 604800, "month": 2419200}
+
+# {(query, table version): series} in least recently used order
+_series_cache: OrderedDict[tuple[Any, ...], list[dict[str, Any]]] = OrderedDict()
+_series_lock = threading.Lock()
+
+
+def _truncate(value: datetime, every: str) -> datetime:
+    """Start of the bucket containing value."""
+    truncated: datetime = pl.select(pl.lit(value).dt.truncate(every)).item()
+    return truncated
+
+
+def calc_timeseries(
+    metric: str,
+    granularity: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    filters: dict[str, str] | None = None,
+) -> list[dict[str, Any]]:
+    """Count a metric per time bucket in [start, end), empty buckets included.
+
+    Defaults to START_DATE up to the end of the current bucket. Raises
+    ValueError for unknown metrics, granularities or filters and for ranges
+    with too many buckets. Results are cached per query and table version.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    table = METRICS[metric]["table"]
+    filters = filters or {}
+    unknown = set(filters) - set(METRICS[metric]["filters"])
+    if unknown:
+        raise ValueError(f"Unknown filters for {metric}: {', '.join(sorted(unknown))}")
+
+    every = GRANULARITIES[granularity]
+    if start is None:
+        start = datetime.strptime(START_DATE, "%Y-%m-%d")
+    if end is None:
+        # End of the current bucket, so the cache key is stable within it
+        end = pl.select(
+            pl.lit(_truncate(datetime.now(), every)).dt.offset_by(every)
+        ).item()
+    if start >= end:
+        raise ValueError("start must be before end")
+    if (end - start).total_seconds() / _APPROX_BUCKET_SECONDS[
+        granularity
+    ] > MAX_BUCKETS:
+        raise ValueError(f"Range spans more than {MAX_BUCKETS} buckets")
+
+    version, manifest = table_version(table)
+    key = (metric, granularity, start, end, tuple(sorted(filters.items())), version)
+    with _series_lock:
+        if key in _series_cache:
+            _series_cache.move_to_end(key)
+            return _series_cache[key]
+
+    series = _bucket_counts(table, every, start, end, filters, manifest)
+
+    with _series_lock:
+        _series_cache[key] = series
+        while len(_series_cache) > TIMESERIES_CACHE_SIZE:
+            _series_cache.popitem(last=False)
+    return series
+
+
+def _bucket_counts(
+    table: str,
+    every: str,
+    start: datetime,
+    end: datetime,
+    filters: dict[str, str],
+    manifest: dict[str, Any] | None,
+) -> list[dict[str, Any]]:
+    """Rows per bucket of the table's time column, from a pushed-down scan."""
+    time_col = TIME_COLUMNS[table]
+    lf = scan_table_range(table, start, end, manifest)
+
+    # Filter values arrive as strings; compare numeric columns as numbers
+    schema = lf.collect_schema()
+    for column, value in filters.items():
+        typed: Any = value
+        if schema[column].is_integer():
+            try:
+                typed = int(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for {column}: {value}") from None
+        lf = lf.filter(pl.col(column) == typed)
+
+    counts = (
+        lf.select(pl.col(time_col).dt.truncate(every).cast(pl.Datetime("us")))
+        .group_by(time_col)
+        .len()
+    )
+    buckets = pl.LazyFrame(
+        {
+            time_col: pl.datetime_range(
+                _truncate(start, every), end, every, closed="left", eager=True
+            )
+        }
+    )
+    df = buckets.join(counts, on=time_col, how="left").sort(time_col).collect()
+    return [
+        {"bucket": bucket.isoformat(), "value": count or 0}
+        for bucket, count in df.iter_rows()
+    ]
@@ -1,101 +1,54 @@
 """Traffic statistics calculation using Polars."""
 
-from datetime import timedelta
-from pathlib import Path
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR, START_DATE
+from calculations.plan import Plan, collect_plan
+from util.sessions import read_sessions
+from util.table_store import lazy_table
 
 
-def calc_traffic() -> dict[str, Any]:
-    """Calculate traffic statistics from Parquet files."""
-    data_dir = Path(DATA_DIR)
-
+def plan_traffic() -> Plan:
+    """Lazy queries for the traffic statistics."""
     # Load page view data
-    df_page_views = pl.read_parquet(
-        data_dir / "fpp_page_views.parquet", columns=["user_id", "viewed_at"]
-    ).rename({"viewed_at": "activity_at"})
+    lf_page_views = (
+        lazy_table("fpp_page_views")
+        .select(["user_id", "viewed_at"])
+        .rename({"viewed_at": "activity_at"})
+    )
 
-    # Count unique users
-    unique_users = df_page_views["user_id"].n_unique()
+    # BOUNCE RATE and DURATION - sessions are materialized by the updater and
+    # only include activity after START_DATE
+    sessions = read_sessions()
 
-    # Count total page views
-    page_views = len(df_page_views)
+    return {
+        # Unique users and total page views
+        "page_views": lf_page_views.select(
+            [pl.col("user_id").n_unique().alias("unique_users"), pl.len()]
+        ),
+        "estimations": sessions.filter("estimated").select(
+            pl.col("user_id").n_unique().alias("users_who_estimated")
+        ),
+        "sessions": sessions.select(
+            ((pl.col("session_end") - pl.col("session_start")).dt.total_seconds() + 10)
+            .mean()
+            .alias("adjusted_duration")
+        ),
+    }
 
-    # BOUNCE RATE
-    df_estimations = pl.read_parquet(
-        data_dir / "fpp_estimations.parquet", columns=["user_id", "estimated_at"]
-    ).rename({"estimated_at": "activity_at"})
 
-    # Filter to entries after START_DATE
-    start_ts = pl.lit(START_DATE).str.to_datetime()
-    df_estimations_filtered = df_estimations.filter(pl.col("activity_at") > start_ts)
-    df_page_views_filtered = df_page_views.filter(pl.col("activity_at") > start_ts)
+def finish_traffic(frames: dict[str, pl.DataFrame]) -> dict[str, Any]:
+    """Traffic statistics from the collected queries."""
+    unique_users, page_views = frames["page_views"].row(0)
 
     # Calculate bounce rate
-    users_who_estimated = df_estimations_filtered["user_id"].n_unique()
+    users_who_estimated = frames["estimations"].item()
     bounce_rate = round(1 - (users_who_estimated / unique_users), 2)
 
-    # DURATION - Session calculation
-    df_joined = pl.concat(
-        [
-            df_page_views_filtered.select(["user_id", "activity_at"]),
-            df_estimations_filtered.select(["user_id", "activity_at"]),
-        ]
-    )
-
-    # Sort by user_id and activity_at
-    df_joined = df_joined.sort(["user_id", "activity_at"])
-
-    # Calculate time difference and detect new sessions
-    df_joined = df_joined.with_columns(
-        [
-            pl.col("activity_at").diff().alias("time_diff"),
-            pl.col("user_id").shift(1).alias("prev_user_id"),
-        ]
-    )
-
-    # New session if time_diff > 10 minutes or different user
-    df_joined = df_joined.with_columns(
-        [
-            (
-                (pl.col("time_diff") > timedelta(minutes=10))
-                | (pl.col("user_id") != pl.col("prev_user_id"))
-                | pl.col("time_diff").is_null()
-            ).alias("new_session")
-        ]
-    )
-
-    # Assign session numbers
-    df_joined = df_joined.with_columns(
-        [pl.col("new_session").cum_sum().alias("session")]
-    )
-
-    # Calculate session duration
-    session_durations = (
-        df_joined.group_by("session")
-        .agg(
-            [
-                pl.col("activity_at").min().alias("session_start"),
-                pl.col("activity_at").max().alias("session_end"),
-            ]
-        )
-        .with_columns(
-            [
-                (
-                    (pl.col("session_end") - pl.col("session_start")).dt.total_seconds()
-                    + 10
-                ).alias("adjusted_duration")
-            ]
-        )
-    )
-
     # Average duration in minutes
-    avg_duration_seconds = session_durations["adjusted_duration"].mean()
-    # Cast to float for type safety (Polars mean() returns numeric or None)
-    avg_seconds_float = float(avg_duration_seconds or 0)  # type: ignore[arg-type]
+    avg_duration_seconds = frames["sessions"].item()
+    avg_seconds_float = float(avg_duration_seconds or 0)
     average_duration = round(avg_seconds_float / 60, 2)
 
     return {
@@ -104,3 +57,8 @@ def calc_traffic() -> dict[str, Any]:
         "bounce_rate": bounce_rate,
         "average_duration": average_duration,
     }
+
+
+def calc_traffic() -> dict[str, Any]:
+    """Calculate traffic statistics from Parquet files."""
+    return finish_traffic(collect_plan(plan_traffic()))
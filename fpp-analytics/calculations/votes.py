@@ -1,17 +1,26 @@
 """Vote statistics calculation using Polars."""
 
-from pathlib import Path
 from typing import Any
 
 import polars as pl
 
-from config import DATA_DIR
+from calculations.plan import Plan, collect_plan
+from util.table_store import lazy_table
 
+WEEKDAY_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
 
-def calc_votes() -> dict[str, Any]:
-    """Calculate vote statistics from Parquet file."""
-    data_dir = Path(DATA_DIR)
-    lf = pl.scan_parquet(data_dir / "fpp_votes.parquet")
+
+def plan_votes() -> Plan:
+    """Lazy queries for the vote statistics."""
+    lf = lazy_table("fpp_votes")
 
     # Aggregate all metrics in a single query
     metrics = lf.select(
@@ -25,7 +34,7 @@ def calc_votes() -> dict[str, Any]:
             pl.col("min_estimation").mean().alias("avg_min_estimation"),
             pl.col("max_estimation").mean().alias("avg_max_estimation"),
         ]
-    ).collect()
+    )
 
     # Weekday distribution
     weekday_counts = (
@@ -33,36 +42,33 @@ def calc_votes() -> dict[str, Any]:
         .group_by("weekday")
         .len()
         .sort("weekday")
-        .collect()
     )
 
-    weekday_names = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    weekday_dict = {
-        weekday_names[row["weekday"] - 1]: row["len"]
-        for row in weekday_counts.iter_rows(named=True)
+    # Estimation value distribution
+    lf_estimations = lazy_table("fpp_estimations")
+    estimation_counts = lf_estimations.group_by("estimation").len().sort("estimation")
+
+    return {
+        "metrics": metrics,
+        "weekday_counts": weekday_counts,
+        "estimation_counts": estimation_counts,
     }
 
-    # Estimation value distribution
-    lf_estimations = pl.scan_parquet(data_dir / "fpp_estimations.parquet")
-    estimation_counts = (
-        lf_estimations.group_by("estimation").len().sort("estimation").collect()
-    )
+
+def finish_votes(frames: dict[str, pl.DataFrame]) -> dict[str, Any]:
+    """Vote statistics from the collected queries."""
+    weekday_dict = {
+        WEEKDAY_NAMES[row["weekday"] - 1]: row["len"]
+        for row in frames["weekday_counts"].iter_rows(named=True)
+    }
 
     estimation_dict = {
         int(row["estimation"]): row["len"]
-        for row in estimation_counts.iter_rows(named=True)
+        for row in frames["estimation_counts"].iter_rows(named=True)
         if row["estimation"] is not None
     }
 
-    row = metrics.row(0, named=True)
+    row = frames["metrics"].row(0, named=True)
     return {
         "total_votes": row["total_votes"],
         "total_estimations": int(row["total_estimations"] or 0),
@@ -75,3 +81,8 @@ def calc_votes() -> dict[str, Any]:
         "weekday_counts": weekday_dict,
         "estimation_counts": estimation_dict,
     }
+
+
+def calc_votes() -> dict[str, Any]:
+    """Calculate vote statistics from Parquet file."""
+    return finish_votes(collect_plan(plan_votes()))
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Standalone script to compact the read model's Parquet segments.
+Runs periodically next to update_readmodel.py (e.g. hourly).
+Rewrites every partition into one file sorted by the table's time column, with
+tuned row groups, zstd and full statistics. Pending deltas of mutable tables are
+folded into the partitions they touch. Readers switch over atomically via the
+table manifest; replaced files are deleted after a grace period.
+"""
+
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Imports after load_dotenv() to ensure environment variables are available
+import time  # noqa: E402
+import uuid  # noqa: E402
+from collections import defaultdict  # noqa: E402
+from datetime import UTC, datetime  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Any  # noqa: E402
+
+import polars as pl  # noqa: E402
+import sentry_sdk  # noqa: E402
+
+from util.sentry_wrapper import (  # noqa: E402
+    ErrorContext,
+    add_error_breadcrumb,
+    capture_error,
+)
+from util.storage import (  # noqa: E402
+    MUTABLE_TABLES,
+    PARTITION_FORMAT,
+    PARTITION_KEY,
+    TIME_COLUMNS,
+    manifest_matches_dataset,
+    merge_deltas,
+    purge_obsolete,
+    read_manifest,
+    relative_path,
+    save_manifest,
+    table_dir,
+    table_lock,
+)
+
+SENTRY_DSN = os.getenv("FPP_ANALYTICS_SENTRY_DSN")
+
+# Rows per row group: large enough for efficient scans, small enough that
+# min/max statistics let time-range filters skip most of a partition
+COMPACT_ROW_GROUP_SIZE = int(os.getenv("COMPACT_ROW_GROUP_SIZE", "100000"))
+
+# Replaced segments stay on disk this long so in-flight scans can finish
+COMPACT_GRACE_SECONDS = int(os.getenv("COMPACT_GRACE_SECONDS", "600"))
+
+COMPACTED_SUFFIX = "-compacted.parquet"
+
+
+def timed_full_scan(files: list[Path]) -> float:
+    """Seconds to read all rows of the given segments."""
+    start = time.perf_counter()
+    if files:
+        pl.scan_parquet(files, hive_partitioning=False).collect()
+    return time.perf_counter() - start
+
+
+def needs_compaction(files: list[str]) -> bool:
+    """A partition is done once it consists of a single compacted file."""
+    return len(files) > 1 or not files[0].endswith(COMPACTED_SUFFIX)
+
+
+def write_compacted(table: str, partition_dir: Path, df: pl.DataFrame) -> Path:
+    """Write one partition as a single sorted, compacted file."""
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    name = f"part-{stamp}-{uuid.uuid4().hex[:8]}{COMPACTED_SUFFIX}"
+    compacted_path = partition_dir / name
+    temp_path = partition_dir / f".{name}.tmp"
+
+    df.sort(TIME_COLUMNS[table]).write_parquet(
+        temp_path,
+        compression="zstd",
+        statistics="full",
+        row_group_size=COMPACT_ROW_GROUP_SIZE,
+    )
+    temp_path.rename(compacted_path)
+    return compacted_path
+
+
+def compact_partition(table: str, files: list[Path]) -> Path:
+    """Merge segments of one partition into a single sorted file."""
+    df = pl.read_parquet(files, hive_partitioning=False)
+    return write_compacted(table, files[0].parent, df)
+
+
+def group_partitions(files: list[str]) -> dict[str, list[str]]:
+    """Group manifest file paths by their partition directory."""
+    partitions: dict[str, list[str]] = defaultdict(list)
+    for f in files:
+        partitions[f.split("/", 1)[0]].append(f)
+    return partitions
+
+
+def fold_deltas(table: str, manifest: dict[str, Any]) -> list[str]:
+    """Rewrite the partitions holding delta keys with the deltas applied.
+
+    Time columns never change, so a delta row lands in the partition of the
+    row it replaces and all other partitions are kept as they are. Updates the
+    manifest in place (files, deltas, row count) and returns the replaced
+    files. The caller publishes the manifest.
+    """
+    directory = table_dir(table)
+    deltas = [directory / f for f in manifest["deltas"]]
+    partition_of = pl.col(TIME_COLUMNS[table]).dt.strftime(PARTITION_FORMAT)
+    touched = set(
+        pl.scan_parquet(deltas).select(partition_of.unique()).collect().to_series()
+    )
+
+    live: list[str] = []
+    replaced = list(manifest["deltas"])
+    for partition, files in group_partitions(manifest["files"]).items():
+        month = partition.removeprefix(f"{PARTITION_KEY}=")
+        if month not in touched:
+            live.extend(files)
+            continue
+        base = pl.scan_parquet([directory / f for f in files], hive_partitioning=False)
+        merged = (
+            merge_deltas(base, deltas, MUTABLE_TABLES[table]["key"])
+            .filter(partition_of == month)
+            .collect()
+        )
+        manifest["row_count"] += merged.height - base.select(pl.len()).collect().item()
+        compacted = write_compacted(table, directory / partition, merged)
+        live.append(relative_path(table, compacted))
+        replaced.extend(files)
+
+    manifest["files"] = sorted(live)
+    manifest["deltas"] = []
+    return replaced
+
+
+def compact_table(table: str) -> dict[str, Any]:
+    """Compact all partitions of a table and publish them in one manifest write.
+
+    Tables without pending deltas or partitions to merge are left alone. The
+    scan timings cover only the replaced files and what replaced them.
+    """
+    start = time.perf_counter()
+
+    with table_lock(table):
+        manifest = read_manifest(table)
+        if manifest is None or not manifest_matches_dataset(manifest, table):
+            # The updater rebuilds the manifest on its next sync
+            return {"table": table, "skipped": True}
+
+        directory = table_dir(table)
+        bytes_before = manifest["size_bytes"]
+        segments_before = manifest["segments"]
+
+        partitions = group_partitions(manifest["files"])
+        if not manifest["deltas"] and not any(
+            needs_compaction(files) for files in partitions.values()
+        ):
+            if manifest["obsolete"]:
+                purge_obsolete(table, manifest, COMPACT_GRACE_SECONDS)
+                save_manifest(table, manifest)
+            return {"table": table, "skipped": False, "compacted": False}
+
+        files_before = set(manifest["files"])
+        replaced = fold_deltas(table, manifest) if manifest["deltas"] else []
+        live: list[str] = []
+        for files in group_partitions(manifest["files"]).values():
+            if not needs_compaction(files):
+                live.extend(files)
+                continue
+            compacted = compact_partition(table, [directory / f for f in files])
+            live.append(relative_path(table, compacted))
+            replaced.extend(files)
+        manifest["files"] = sorted(live)
+
+        # Replaced files are still on disk until purged below
+        scan_before = timed_full_scan([directory / f for f in replaced])
+
+        since = datetime.now(UTC).isoformat()
+        manifest["obsolete"] += [{"path": f, "since": since} for f in replaced]
+        freed = purge_obsolete(table, manifest, COMPACT_GRACE_SECONDS)
+        save_manifest(table, manifest)
+        written = [f for f in manifest["files"] if f not in files_before]
+
+    scan_after = timed_full_scan([directory / f for f in written])
+
+    return {
+        "table": table,
+        "skipped": False,
+        "compacted": True,
+        "partitions": len(partitions),
+        "segments_before": segments_before,
+        "segments_after": manifest["segments"],
+        "bytes_before": bytes_before,
+        "bytes_after": manifest["size_bytes"],
+        "bytes_freed": freed,
+        "scan_before": scan_before,
+        "scan_after": scan_after,
+        "duration": time.perf_counter() - start,
+    }
+
+
+def log_stats(stats: dict[str, Any]) -> None:
+    """Print a one-line compaction summary for a table."""
+    if stats["skipped"]:
+        print(f"  {stats['table']}: skipped (no valid manifest)")
+        return
+    if not stats["compacted"]:
+        print(f"  {stats['table']}: already compacted")
+        return
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(
+        f"  {stats['table']}: {stats['segments_before']} -> {stats['segments_after']} segments, "
+        f"{saved / 1024:.1f} KiB saved, "
+        f"scan {stats['scan_before'] * 1000:.0f}ms -> {stats['scan_after'] * 1000:.0f}ms "
+        f"({stats['duration']:.1f}s)"
+    )
+
+
+def compact_all() -> list[str]:
+    """Compact every table; return the per-table error messages."""
+    start_time = datetime.now()
+    errors = []
+    bytes_saved = 0
+
+    add_error_breadcrumb(
+        message="Starting read model compaction",
+        category="compaction",
+        data={"tables": list(TIME_COLUMNS.keys())},
+    )
+
+    for table in TIME_COLUMNS:
+        try:
+            stats = compact_table(table)
+            log_stats(stats)
+            if stats.get("compacted"):
+                bytes_saved += stats["bytes_before"] - stats["bytes_after"]
+        except Exception as e:
+            error_msg = f"{table}: {e}"
+            print(f"[{datetime.now().isoformat()}] ERROR {error_msg}")
+            errors.append(error_msg)
+            capture_error(
+                e,
+                ErrorContext(
+                    component="compact_readmodel",
+                    action="compact_table",
+                    extra={"table": table, "error_msg": error_msg},
+                ),
+                severity="high",
+            )
+
+    duration = (datetime.now() - start_time).total_seconds()
+    error_suffix = f", {len(errors)} errors" if errors else ""
+    print(
+        f"[{datetime.now().isoformat()}] Compaction: {bytes_saved / 1024:.1f} KiB saved ({duration:.1f}s){error_suffix}"
+    )
+    return errors
+
+
+def main() -> None:
+    # Initialize Sentry for error tracking (the updater daemon inits its own)
+    if SENTRY_DSN:
+        sentry_sdk.init(
+            dsn=SENTRY_DSN,
+            environment=os.getenv("SENTRY_ENVIRONMENT", "production"),
+            traces_sample_rate=0.1,
+        )
+
+    errors = compact_all()
+
+    if SENTRY_DSN:
+        sentry_sdk.flush(timeout=5.0)
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
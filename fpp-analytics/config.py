@@ -18,9 +18,42 @@ DB_CONFIG = {
     "use_pure": True,
 }
 
+# Calculation executor: threads for Polars work (Polars releases the GIL)
+CALC_THREADS = max(1, int(os.getenv("CALC_THREADS", "6")))
+
+# Memory cap of the in-memory table store shared by all calculations
+TABLE_STORE_MAX_MB = int(os.getenv("TABLE_STORE_MAX_MB", "1024"))
+
+# Room statistics kept in the LRU result cache (per room and votes version)
+ROOM_STATS_CACHE_SIZE = int(os.getenv("ROOM_STATS_CACHE_SIZE", "4096"))
+
+# Metric series kept in the LRU result cache (per query and table version)
+TIMESERIES_CACHE_SIZE = int(os.getenv("TIMESERIES_CACHE_SIZE", "256"))
+
+# Keep the reoccurring series' per-user/room state between refreshes, so each
+# refresh only folds in the days since the previous one
+REOCCURRING_INCREMENTAL = (
+    os.getenv("REOCCURRING_INCREMENTAL", "false").lower() == "true"
+)
+
+# Compute the analytics sections concurrently instead of one after another
+CALC_PARALLEL_SECTIONS = os.getenv("CALC_PARALLEL_SECTIONS", "true").lower() == "true"
+
+# Collect the stale sections' queries as one fused Polars plan (takes precedence
+# over CALC_PARALLEL_SECTIONS)
+CALC_FUSED_SECTIONS = os.getenv("CALC_FUSED_SECTIONS", "false").lower() == "true"
+
 # Authentication
 ANALYTICS_SECRET_TOKEN = os.getenv("ANALYTICS_SECRET_TOKEN")
 
+# Seconds between checks of cache_status.txt (fallback for missed refresh notifications)
+CACHE_WATCH_INTERVAL = float(os.getenv("CACHE_WATCH_INTERVAL", "30"))
+
+# Serve the previous analytics response (X-Cache: STALE) while a refresh runs
+CACHE_STALE_WHILE_REVALIDATE = (
+    os.getenv("CACHE_STALE_WHILE_REVALIDATE", "false").lower() == "true"
+)
+
 # Email service
 BEA_BASE_URL = os.getenv("BEA_BASE_URL")
 BEA_SECRET_KEY = os.getenv("BEA_SECRET_KEY")
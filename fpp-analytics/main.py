@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from collections.abc import AsyncIterator, Awaitable, Callable
@@ -12,8 +13,15 @@ from sentry_sdk.integrations.starlette import StarletteIntegration
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 
-from config import ANALYTICS_SECRET_TOKEN, SENTRY_DSN, SENTRY_ENVIRONMENT
-from routers import analytics, health, room
+from config import (
+    ANALYTICS_SECRET_TOKEN,
+    CACHE_WATCH_INTERVAL,
+    SENTRY_DSN,
+    SENTRY_ENVIRONMENT,
+)
+from routers import analytics, health, metrics, room
+from util.cache import watch_cache_status
+from util.executor import shutdown_executor
 from util.sentry_wrapper import ErrorContext, capture_error
 
 
@@ -150,7 +158,13 @@ async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
                 None if event.get("transaction") == "/health" else event
             ),
         )
+    # Warm the analytics cache and keep it fresh in the background
+    watcher = asyncio.create_task(
+        watch_cache_status(analytics.SECTIONS, CACHE_WATCH_INTERVAL)
+    )
     yield
+    watcher.cancel()
+    shutdown_executor()
     # Shutdown: Flush Sentry events
     if SENTRY_DSN:
         sentry_sdk.flush(timeout=2.0)
@@ -201,6 +215,9 @@ app.include_router(health.router)
 # Authenticated analytics routes
 app.include_router(analytics.router, dependencies=[Depends(verify_auth)])
 app.include_router(room.router, prefix="/room", dependencies=[Depends(verify_auth)])
+app.include_router(
+    metrics.router, prefix="/metrics", dependencies=[Depends(verify_auth)]
+)
 
 
 if __name__ == "__main__":
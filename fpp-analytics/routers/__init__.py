@@ -1,3 +1,3 @@
-from routers import analytics, health, room
+from routers import analytics, health, metrics, room
 
-__all__ = ["analytics", "room", "health"]
+__all__ = ["analytics", "room", "metrics", "health"]
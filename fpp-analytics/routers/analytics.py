@@ -1,24 +1,116 @@
+from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 
-from calculations.behaviour import calc_behaviour
+from calculations.behaviour import calc_behaviour, finish_behaviour, plan_behaviour
 from calculations.daily import calc_daily_analytics
-from calculations.historical import calc_historical
-from calculations.location import calc_location_and_user_agent
-from calculations.reoccurring import calc_reoccurring
-from calculations.traffic import calc_traffic
-from calculations.votes import calc_votes
-from util.cache import get_cached_response, set_cached_response
+from calculations.historical import calc_historical, finish_historical, plan_historical
+from calculations.location import (
+    calc_location_and_user_agent,
+    finish_location_and_user_agent,
+    plan_location_and_user_agent,
+)
+from calculations.reoccurring import (
+    calc_reoccurring,
+    finish_reoccurring,
+    plan_reoccurring,
+)
+from calculations.traffic import calc_traffic, finish_traffic, plan_traffic
+from calculations.votes import calc_votes, finish_votes, plan_votes
+from config import CACHE_STALE_WHILE_REVALIDATE
+from util.cache import (
+    Sections,
+    compute_sections,
+    encode_payload,
+    explain_sections,
+    get_cached_response,
+    get_last_response,
+    refresh_cache,
+    schedule_refresh,
+)
+from util.executor import run_calc
 from util.http_client import send_daily_email
 from util.sentry_wrapper import ErrorContext, add_error_breadcrumb, capture_error
+from util.storage import to_storage_time
 
 router = APIRouter()
 
 
+# Dashboard sections and the tables they read; a section is only recomputed
+# when one of its tables changed (or, for per-day series, the date did).
+SECTIONS: Sections = {
+    "traffic": {
+        "calc": calc_traffic,
+        "plan": plan_traffic,
+        "finish": finish_traffic,
+        "tables": ["fpp_page_views", "fpp_estimations"],
+        "per_day": False,
+    },
+    "votes": {
+        "calc": calc_votes,
+        "plan": plan_votes,
+        "finish": finish_votes,
+        "tables": ["fpp_votes", "fpp_estimations"],
+        "per_day": False,
+    },
+    "behaviour": {
+        "calc": calc_behaviour,
+        "plan": plan_behaviour,
+        "finish": finish_behaviour,
+        "tables": ["fpp_page_views", "fpp_events", "fpp_votes", "fpp_rooms"],
+        "per_day": False,
+    },
+    "reoccurring": {
+        "calc": calc_reoccurring,
+        "plan": plan_reoccurring,
+        "finish": finish_reoccurring,
+        "tables": ["fpp_estimations"],
+        "per_day": True,
+    },
+    "historical": {
+        "calc": calc_historical,
+        "plan": plan_historical,
+        "finish": finish_historical,
+        "tables": [
+            "fpp_users",
+            "fpp_page_views",
+            "fpp_rooms",
+            "fpp_estimations",
+            "fpp_votes",
+        ],
+        "per_day": True,
+    },
+    "location_and_user_agent": {
+        "calc": calc_location_and_user_agent,
+        "plan": plan_location_and_user_agent,
+        "finish": finish_location_and_user_agent,
+        "tables": ["fpp_users"],
+        "per_day": False,
+    },
+}
+
+
+def payload_response(request: Request, payload: dict[str, Any], cache: str) -> Response:
+    """Send a pre-encoded payload: 304 on a matching ETag, gzip when accepted.
+
+    Both encodings carry their own strong ETag, as their bytes differ.
+    """
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    etag = payload["gzip_etag"] if gzipped else payload["etag"]
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "X-Cache": cache}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(payload["gzip"], media_type="application/json", headers=headers)
+    return Response(payload["body"], media_type="application/json", headers=headers)
+
+
 @router.get("/")
-async def get_analytics(response: Response) -> dict[str, Any]:
-    """Main analytics endpoint - cached, invalidated when Parquet files update."""
+async def get_analytics(request: Request) -> Response:
+    """Main analytics endpoint - served from cache, refreshed when Parquet files update."""
     try:
         add_error_breadcrumb(
             message="Fetching analytics data",
@@ -26,28 +118,35 @@ async def get_analytics(response: Response) -> dict[str, Any]:
             data={"endpoint": "get_analytics"},
         )
 
-        cached, cache_hit, cache_ts = get_cached_response()
-        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+        cached, cache_hit, cache_ts = get_cached_response(SECTIONS)
 
         if cached is not None:
-            return {**cached, "data_updated_at": cache_ts}
-
-        # Calculate all metrics
-        result = {
-            "data": {
-                "traffic": calc_traffic(),
-                "votes": calc_votes(),
-                "behaviour": calc_behaviour(),
-                "reoccurring": calc_reoccurring(),
-                "historical": calc_historical(),
-                "location_and_user_agent": calc_location_and_user_agent(),
-            }
-        }
-
-        if cache_ts is not None:
-            set_cached_response(result, cache_ts)
-
-        return {**result, "data_updated_at": cache_ts}
+            return payload_response(request, cached, "HIT")
+
+        if cache_ts is None:
+            # No sync has completed yet, nothing to cache against
+            data, errors = await compute_sections(SECTIONS, list(SECTIONS))
+            if errors:
+                raise next(iter(errors.values()))
+            payload = await run_calc(encode_payload, data, None)
+            return payload_response(request, payload, "MISS")
+
+        stale = get_last_response()
+        if CACHE_STALE_WHILE_REVALIDATE and stale is not None:
+            schedule_refresh(SECTIONS)
+            return payload_response(request, stale, "STALE")
+
+        # Normally warmed by the updater's notification; join that refresh
+        await refresh_cache(SECTIONS)
+        cached = get_last_response()
+        if cached is None:
+            # The status file disappeared while refreshing
+            data, errors = await compute_sections(SECTIONS, list(SECTIONS))
+            if errors:
+                raise next(iter(errors.values()))
+            cached = await run_calc(encode_payload, data, None)
+
+        return payload_response(request, cached, "MISS")
 
     except Exception as e:
         capture_error(
@@ -62,17 +161,50 @@ async def get_analytics(response: Response) -> dict[str, Any]:
         raise
 
 
+@router.post("/internal/refresh", status_code=202)
+async def refresh_analytics() -> dict[str, str]:
+    """Sync-complete notification from the updater: recompute in the background."""
+    schedule_refresh(SECTIONS)
+    return {"status": "scheduled"}
+
+
+@router.get("/internal/plan", response_class=PlainTextResponse)
+async def get_analytics_plan() -> str:
+    """Combined optimized query plan of all sections, for debugging fused mode."""
+    plan: str = await run_calc(explain_sections, SECTIONS)
+    return plan
+
+
 @router.get("/daily-analytics")
-async def get_daily_analytics() -> dict[str, Any]:
-    """Calculate daily analytics and send email report."""
+async def get_daily_analytics(
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+) -> dict[str, Any]:
+    """Calculate daily analytics and send email report.
+
+    With `from`/`to` the metrics cover that window instead (weekly, monthly
+    reports) and no email is sent.
+    """
+    start = to_storage_time(start)
+    end = to_storage_time(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
     try:
         add_error_breadcrumb(
             message="Calculating daily analytics",
             category="analytics",
-            data={"endpoint": "get_daily_analytics"},
+            data={
+                "endpoint": "get_daily_analytics",
+                "from": start.isoformat() if start else None,
+                "to": end.isoformat() if end else None,
+            },
         )
 
-        daily = calc_daily_analytics()
+        daily: dict[str, Any] = await run_calc(calc_daily_analytics, start, end)
+
+        if start is not None or end is not None:
+            return daily
 
         add_error_breadcrumb(
             message="Sending daily email",
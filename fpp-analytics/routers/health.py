@@ -1,34 +1,29 @@
-from pathlib import Path
 from typing import Any
 
 from fastapi import APIRouter
 
-from config import DATA_DIR
+from util.storage import table_exists, table_size_bytes
 
 router = APIRouter()
 
-REQUIRED_FILES = [
-    "fpp_estimations.parquet",
-    "fpp_events.parquet",
-    "fpp_page_views.parquet",
-    "fpp_rooms.parquet",
-    "fpp_users.parquet",
-    "fpp_votes.parquet",
+REQUIRED_TABLES = [
+    "fpp_estimations",
+    "fpp_events",
+    "fpp_page_views",
+    "fpp_rooms",
+    "fpp_users",
+    "fpp_votes",
 ]
 
 
 @router.get("/health")
 async def health_check() -> dict[str, Any]:
-    """Health check endpoint - verifies Parquet files exist."""
-    data_dir = Path(DATA_DIR)
-
-    parquet_status = {f: (data_dir / f).exists() for f in REQUIRED_FILES}
+    """Health check endpoint - verifies Parquet datasets exist."""
+    parquet_status = {t: table_exists(t) for t in REQUIRED_TABLES}
 
     all_present = all(parquet_status.values())
 
-    total_size = sum(
-        (data_dir / f).stat().st_size for f in REQUIRED_FILES if (data_dir / f).exists()
-    )
+    total_size = sum(table_size_bytes(t) for t in REQUIRED_TABLES)
 
     return {
         "status": "ok" if all_present else "degraded",
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from calculations.timeseries import calc_timeseries
+from util.executor import run_calc
+from util.sentry_wrapper import ErrorContext, add_error_breadcrumb, capture_error
+from util.storage import to_storage_time
+
+router = APIRouter()
+
+# Query parameters that are not metric filters
+_RESERVED_PARAMS = {"metric", "granularity", "from", "to"}
+
+
+@router.get("/timeseries")
+async def get_timeseries(
+    request: Request,
+    metric: str,
+    granularity: str = "day",
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+) -> dict[str, Any]:
+    """Metric counts per hour/day/week/month bucket of a time range.
+
+    Any further query parameters filter the metric's rows (e.g. `room_id`).
+    """
+    start = to_storage_time(start)
+    end = to_storage_time(end)
+    filters = {
+        key: value
+        for key, value in request.query_params.items()
+        if key not in _RESERVED_PARAMS
+    }
+
+    try:
+        add_error_breadcrumb(
+            message="Fetching metric time series",
+            category="analytics",
+            data={"metric": metric, "granularity": granularity, "filters": filters},
+        )
+
+        series: list[dict[str, Any]] = await run_calc(
+            calc_timeseries, metric, granularity, start, end, filters
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    except Exception as e:
+        capture_error(
+            e,
+            ErrorContext(
+                component="metrics_router",
+                action="get_timeseries",
+                extra={"metric": metric, "granularity": granularity},
+            ),
+            severity="high",
+        )
+        raise
+
+    return {"metric": metric, "granularity": granularity, "series": series}
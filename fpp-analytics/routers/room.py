@@ -1,12 +1,24 @@
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
 
-from calculations.room_stats import calc_room_stats
+from calculations.room_stats import calc_room_stats, calc_rooms_stats
+from util.executor import run_calc
 from util.sentry_wrapper import ErrorContext, add_error_breadcrumb, capture_error
 
 router = APIRouter()
 
+# Upper bound for rooms per batch request
+MAX_BATCH_ROOMS = 1000
+
+
+class RoomStatsRequest(BaseModel):
+    """Batch selector: explicit room ids or the top N rooms by votes."""
+
+    room_ids: list[int] | None = None
+    top: int | None = None
+
 
 @router.get("/{room_id}/stats")
 async def get_room_stats(room_id: int) -> dict[str, Any]:
@@ -22,7 +34,8 @@ async def get_room_stats(room_id: int) -> dict[str, Any]:
             data={"room_id": room_id},
         )
 
-        return calc_room_stats(room_id)
+        stats: dict[str, Any] = await run_calc(calc_room_stats, room_id)
+        return stats
 
     except Exception as e:
         capture_error(
@@ -35,3 +48,45 @@ async def get_room_stats(room_id: int) -> dict[str, Any]:
             severity="high",
         )
         raise
+
+
+@router.post("/stats")
+async def get_rooms_stats(request: RoomStatsRequest) -> dict[int, dict[str, Any]]:
+    """Get statistics for many rooms at once, keyed by room id."""
+    # Validate selector
+    if (request.room_ids is None) == (request.top is None):
+        raise HTTPException(status_code=400, detail="Pass either room_ids or top")
+    if request.room_ids is not None and (
+        len(request.room_ids) > MAX_BATCH_ROOMS
+        or any(room_id <= 0 for room_id in request.room_ids)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid room_ids")
+    if request.top is not None and not 0 < request.top <= MAX_BATCH_ROOMS:
+        raise HTTPException(status_code=400, detail="Invalid top")
+
+    try:
+        add_error_breadcrumb(
+            message="Fetching batch room statistics",
+            category="analytics",
+            data={
+                "rooms": len(request.room_ids or []),
+                "top": request.top,
+            },
+        )
+
+        stats: dict[int, dict[str, Any]] = await run_calc(
+            calc_rooms_stats, request.room_ids, request.top
+        )
+        return stats
+
+    except Exception as e:
+        capture_error(
+            e,
+            ErrorContext(
+                component="room_router",
+                action="get_rooms_stats",
+                extra={"top": request.top},
+            ),
+            severity="high",
+        )
+        raise
@@ -0,0 +1,34 @@
+"""Daily rollups over an empty source table."""
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from util import storage
+from util.rollups import read_daily_rollup, refresh_daily_rollup
+from util.storage import new_manifest, save_manifest, scan_table, scan_table_range
+
+TABLE = "fpp_events"
+
+
+@pytest.fixture(autouse=True)
+def empty_table(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    save_manifest(TABLE, new_manifest(TABLE, "id", None, 0, []))
+
+
+def test_scan_empty_table_keeps_schema() -> None:
+    df = scan_table(TABLE).collect()
+    assert df.is_empty()
+    assert df.schema == storage.TABLE_SCHEMAS[TABLE]
+
+
+def test_scan_range_empty_table() -> None:
+    assert scan_table_range(TABLE, None, None).collect().is_empty()
+
+
+def test_refresh_daily_rollup_empty_table() -> None:
+    assert refresh_daily_rollup(TABLE, set(), 0) == 0
+    assert refresh_daily_rollup(TABLE, {date(2024, 1, 1)}, 0) == 1
+    assert read_daily_rollup(TABLE).is_empty()
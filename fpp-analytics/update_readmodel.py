@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
-Standalone script to sync MySQL to flat Parquet files.
-Runs every 10 minutes via docker entrypoint sleep loop.
+Standalone script to sync MySQL to month-partitioned Parquet datasets.
+Runs every 10 minutes via docker entrypoint sleep loop, or as a long-running
+process with --daemon (adaptive polling, only changed tables are synced).
+Each sync appends only the new rows as fresh segments (O(new rows) I/O).
 Direct DB connection (same docker network) - no round-trip.
 """
 
@@ -13,7 +15,16 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Imports after load_dotenv() to ensure environment variables are available
-from datetime import UTC, datetime  # noqa: E402
+import argparse  # noqa: E402
+import json  # noqa: E402
+import queue  # noqa: E402
+import signal  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from collections.abc import Iterator  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from contextlib import contextmanager  # noqa: E402
+from datetime import UTC, date, datetime, timedelta  # noqa: E402
 from pathlib import Path  # noqa: E402
 from typing import Any  # noqa: E402
 
@@ -22,11 +33,35 @@ import polars as pl  # noqa: E402
 import pymysql  # noqa: E402
 import sentry_sdk  # noqa: E402
 
+from compact_readmodel import compact_all  # noqa: E402
+from util.rollups import refresh_daily_rollup  # noqa: E402
+from util.schemas import SCHEMA_VERSION, TABLE_SCHEMAS  # noqa: E402
 from util.sentry_wrapper import (  # noqa: E402
     ErrorContext,
     add_error_breadcrumb,
     capture_error,
 )
+from util.sessions import SESSION_SOURCES, refresh_sessions  # noqa: E402
+from util.storage import (  # noqa: E402
+    MUTABLE_TABLES,
+    PARTITION_FORMAT,
+    TIME_COLUMNS,
+    conform_segments,
+    dataset_files,
+    legacy_file,
+    manifest_matches_dataset,
+    new_manifest,
+    read_manifest,
+    relative_path,
+    remove_orphan_segments,
+    save_manifest,
+    scan_table,
+    table_dir,
+    table_exists,
+    table_lock,
+    write_delta,
+    write_segment,
+)
 
 # Initialize Sentry for error tracking
 SENTRY_DSN = os.getenv("FPP_ANALYTICS_SENTRY_DSN")
@@ -40,6 +75,24 @@ if SENTRY_DSN:
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
 UPTIMEKUMA_PUSH_URL = os.getenv("UPTIMEKUMA_PUSH_URL")
 
+# FastAPI refresh endpoint, notified after each sync that changed data
+ANALYTICS_REFRESH_URL = os.getenv("ANALYTICS_REFRESH_URL")
+ANALYTICS_SECRET_TOKEN = os.getenv("ANALYTICS_SECRET_TOKEN")
+
+# Rows fetched per page; bounds peak memory of a sync (one page = one segment)
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "50000"))
+
+# Tables synced concurrently, each worker holds its own DB connection
+SYNC_PARALLELISM = max(1, int(os.getenv("SYNC_PARALLELISM", "3")))
+
+# Daemon mode: poll interval bounds (seconds) and compaction cadence
+DAEMON_MIN_INTERVAL = float(os.getenv("DAEMON_MIN_INTERVAL", "5"))
+DAEMON_MAX_INTERVAL = float(os.getenv("DAEMON_MAX_INTERVAL", "600"))
+COMPACT_INTERVAL = float(os.getenv("COMPACT_INTERVAL", "3600"))
+
+# Mutable tables: seconds between range checksums that catch in-place updates
+UPSERT_CHECKSUM_INTERVAL = float(os.getenv("UPSERT_CHECKSUM_INTERVAL", "3600"))
+
 # DB config (same docker network)
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "mariadb"),
@@ -61,57 +114,491 @@ TABLES = {
     "fpp_users": "created_at",
 }
 
+# Unique tiebreaker per non-unique sync column: the sync cursor is the pair
+# (sync_col, tiebreaker), so pages never split rows sharing a timestamp
+SYNC_TIEBREAKERS = {"fpp_users": "id"}
+
+# Per-row checksum fetched next to mutable rows (see stream_rows)
+CRC_COLUMN = "__crc"
+
+# Binary collation, so MySQL orders tiebreakers like Polars does (byte order)
+TIEBREAKER_COLLATION = "utf8mb4_bin"
+
+
+def get_sync_state(table: str, sync_col: str) -> dict[str, Any]:
+    """Return the table manifest holding the last synced value and row count.
+
+    The manifest is the source of truth. The dataset is only scanned when the
+    manifest is missing or no longer matches the files on disk, and the
+    manifest is then rebuilt from the scan.
+    """
+    manifest = read_manifest(table)
+    if (
+        manifest is not None
+        and manifest["sync_col"] == sync_col
+        and manifest_matches_dataset(manifest, table)
+    ):
+        remove_orphan_segments(table, manifest)
+        if "last_key" not in manifest:
+            # Manifest from before keyset pagination: derive the cursor once
+            files = [table_dir(table) / f for f in manifest["files"]]
+            manifest["last_key"] = cursor_key(
+                table, files, sync_col, manifest["last_value"]
+            )
+            save_manifest(table, manifest)
+        return manifest
+
+    # Segments already replaced by compaction must not be counted twice
+    obsolete = manifest.get("obsolete", []) if manifest else []
+    deltas = manifest.get("deltas", []) if manifest else []
+    replaced = {entry["path"] for entry in obsolete}
+    files = [f for f in dataset_files(table) if relative_path(table, f) not in replaced]
+
+    last_value, row_count = None, 0
+    if files:
+        last_value, row_count = (
+            pl.scan_parquet(files, hive_partitioning=False)
+            .select(pl.col(sync_col).max(), pl.len())
+            .collect()
+            .row(0)
+        )
+
+    manifest = new_manifest(table, sync_col, last_value, row_count, files)
+    manifest["last_key"] = cursor_key(table, files, sync_col, last_value)
+    manifest["obsolete"] = obsolete
+    manifest["deltas"] = [d for d in deltas if (table_dir(table) / d).exists()]
+    save_manifest(table, manifest)
+    return manifest
+
 
-def get_last_sync_value(parquet_path: Path, sync_col: str) -> Any:
-    """Read last synced value from existing Parquet file metadata."""
-    if not parquet_path.exists():
+def cursor_key(table: str, files: list[Path], sync_col: str, last_value: Any) -> Any:
+    """Tiebreaker of the last synced row, i.e. the largest one at last_value."""
+    tiebreaker = SYNC_TIEBREAKERS.get(table)
+    if tiebreaker is None or last_value is None:
         return None
-    lf = pl.scan_parquet(parquet_path)
-    return lf.select(pl.col(sync_col).max()).collect().item()
+    return (
+        pl.scan_parquet(files, hive_partitioning=False)
+        .filter(pl.col(sync_col) == last_value)
+        .select(pl.col(tiebreaker).max())
+        .collect()
+        .item()
+    )
+
+
+def migrate_legacy_file(table: str) -> None:
+    """Move a pre-dataset `<table>.parquet` into the partitioned layout once."""
+    path = legacy_file(table)
+    if not path.exists():
+        return
+    if not table_exists(table):
+        write_segment(table, pl.read_parquet(path))
+    path.unlink()
+
+
+def stream_rows(
+    conn: Any,
+    table: str,
+    where: str,
+    params: tuple[Any, ...],
+    order_by: str,
+    batch_size: int = SYNC_BATCH_SIZE,
+    limit: int | None = None,
+    with_crc: bool = False,
+) -> Iterator[pl.DataFrame]:
+    """Stream rows matching `where` from MySQL as DataFrame batches.
+
+    Uses an unbuffered server-side cursor, so at most one batch of rows is held
+    in memory regardless of how far behind the read model is. Row tuples are
+    converted column-wise against the declared schema, without type inference.
+    `with_crc` adds each row's `row_crc` as CRC_COLUMN, computed in the same
+    query, so it matches the fetched image exactly.
+    """
+    schema = TABLE_SCHEMAS[table]
+    columns = ", ".join(schema.names())
+    if with_crc:
+        schema = pl.Schema({**schema, CRC_COLUMN: pl.Int64()})
+        columns += f", {row_crc(table)} AS {CRC_COLUMN}"
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+
+    try:
+        # Note: table, columns, where and order_by are built from hardcoded
+        # dicts, so they're safe. Only values go through params.
+        query = f"SELECT {columns} FROM {table} WHERE {where} ORDER BY {order_by}"
+        if limit is not None:
+            query += " LIMIT %s"
+            params = (*params, limit)
+        cursor.execute(query, params)
+
+        while rows := cursor.fetchmany(batch_size):
+            yield pl.DataFrame(rows, schema=schema, orient="row")
+    finally:
+        # Drains any unread rows so the connection is reusable
+        cursor.close()
+
+
+def boundary_keys(table: str, manifest: dict[str, Any]) -> set[Any]:
+    """Tiebreakers of the stored rows at the sync cursor's timestamp."""
+    tiebreaker = SYNC_TIEBREAKERS.get(table)
+    if tiebreaker is None or manifest["last_value"] is None:
+        return set()
+    return set(
+        scan_table(table, manifest)
+        .filter(pl.col(manifest["sync_col"]) == manifest["last_value"])
+        .select(tiebreaker)
+        .collect()
+        .to_series()
+    )
 
 
 def fetch_new_rows(
-    conn: Any, table: str, sync_col: str, since_value: Any
-) -> list[dict[str, Any]]:
-    """Fetch new rows from MySQL since last sync."""
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    conn: Any,
+    table: str,
+    sync_col: str,
+    last_value: Any,
+    stored_keys: set[Any] | None = None,
+    with_crc: bool = False,
+) -> Iterator[pl.DataFrame]:
+    """Fetch new rows since the last sync in keyset-paginated pages.
+
+    Each page is a separate `LIMIT SYNC_BATCH_SIZE` query that resumes after
+    the last row of the previous page, ordered by the sync cursor. With a
+    tiebreaker the cursor is (sync_col, tiebreaker), so rows sharing a
+    timestamp with a page boundary are neither skipped nor fetched twice.
+    Tiebreakers are not monotonic, so the first page re-reads the last synced
+    timestamp and drops the `stored_keys` already stored there; rows committed
+    late with that timestamp are picked up whatever their tiebreaker.
+    """
+    tiebreaker = SYNC_TIEBREAKERS.get(table)
+    order_by = sync_col
+    if tiebreaker is not None:
+        order_by += f", {tiebreaker} COLLATE {TIEBREAKER_COLLATION}"
+
+    params: tuple[Any, ...]
+    last_key = None
+    while True:
+        if last_value is None:
+            where, params = "1 = 1", ()
+        elif tiebreaker is None:
+            where, params = f"{sync_col} > %s", (last_value,)
+        elif last_key is None:
+            where, params = f"{sync_col} >= %s", (last_value,)
+        else:
+            where = (
+                f"({sync_col} > %s OR ({sync_col} = %s AND "
+                f"{tiebreaker} COLLATE {TIEBREAKER_COLLATION} > %s))"
+            )
+            params = (last_value, last_value, last_key)
+
+        page = None
+        for page in stream_rows(
+            conn,
+            table,
+            where,
+            params,
+            order_by,
+            limit=SYNC_BATCH_SIZE,
+            with_crc=with_crc,
+        ):
+            new_rows = page
+            if stored_keys and tiebreaker is not None:
+                new_rows = page.filter(~pl.col(tiebreaker).is_in(list(stored_keys)))
+            if not new_rows.is_empty():
+                yield new_rows
+        if page is None or page.height < SYNC_BATCH_SIZE:
+            return
+
+        last_value = page[sync_col][-1]
+        if tiebreaker is not None:
+            last_key = page[tiebreaker][-1]
+
+
+def row_crc(table: str) -> str:
+    """SQL checksum of a row over its columns, except the update timestamp.
+
+    `updated_col` changes are picked up incrementally; covering it would make
+    every month with activity differ at every check.
+    """
+    updated_col = MUTABLE_TABLES[table]["updated_col"]
+    columns = [c for c in TABLE_SCHEMAS[table].names() if c != updated_col]
+    return f"CRC32(CONCAT_WS('|', {', '.join(columns)}))"
+
+
+def fetch_range_checksums(
+    conn: Any, table: str, sync_col: str, watermark: Any
+) -> dict[str, list[int]]:
+    """Per-month (count, checksum) of the rows in MySQL up to the sync watermark."""
+    time_col = TIME_COLUMNS[table]
+    query = (
+        f"SELECT DATE_FORMAT({time_col}, '%%Y-%%m') AS month, "
+        f"COUNT(*), BIT_XOR({row_crc(table)}) "
+        f"FROM {table} WHERE {sync_col} <= %s GROUP BY month"
+    )
+    cursor = conn.cursor()
+    cursor.execute(query, (watermark,))
+    rows = cursor.fetchall()
+    cursor.close()
+    return {month: [int(n), int(crc)] for month, n, crc in rows}
+
+
+def strip_checksums(
+    table: str,
+    batches: Iterator[pl.DataFrame],
+    checksums: dict[str, list[int]] | None,
+) -> Iterator[pl.DataFrame]:
+    """Fold the CRC_COLUMN of fetched batches into per-month checksums.
+
+    Yields the batches without the column; with `checksums` None (unknown
+    baseline) the column is only dropped.
+    """
+    month = pl.col(TIME_COLUMNS[table]).dt.strftime(PARTITION_FORMAT)
+    for batch_df in batches:
+        if checksums is not None:
+            per_month = batch_df.group_by(month.alias("month")).agg(
+                pl.len(), pl.col(CRC_COLUMN).bitwise_xor()
+            )
+            for key, n, crc in per_month.iter_rows():
+                count, checksum = checksums.get(key, [0, 0])
+                checksums[key] = [count + n, checksum ^ crc]
+        yield batch_df.drop(CRC_COLUMN)
+
+
+def write_delta_batches(
+    table: str, manifest: dict[str, Any], batches: Iterator[pl.DataFrame]
+) -> int:
+    """Write fetched row images as deltas and publish them in the manifest."""
+    updated = 0
+    for batch_df in batches:
+        delta = write_delta(table, batch_df)
+        manifest["deltas"].append(relative_path(table, delta))
+        save_manifest(table, manifest)
+        updated += batch_df.height
+    return updated
+
+
+def drop_unchanged(
+    table: str, manifest: dict[str, Any], batch_df: pl.DataFrame, updated_col: str
+) -> pl.DataFrame:
+    """Drop fetched row images identical in `updated_col` to the stored rows.
+
+    Rows synced in a recent pass still look updated to the timestamp query
+    until the update watermark passes them; their stored image is current.
+    """
+    key = MUTABLE_TABLES[table]["key"]
+    stored = (
+        scan_table(table, manifest)
+        .filter(pl.col(key).is_in(batch_df[key].implode()))
+        .select(key, updated_col)
+        .collect()
+    )
+    return batch_df.join(stored, on=[key, updated_col], how="anti", nulls_equal=True)
+
 
-    # Note: table and sync_col come from hardcoded TABLES dict, so they're safe.
-    # Only since_value needs parameterization.
-    if since_value is None:
-        query = f"SELECT * FROM {table} ORDER BY {sync_col}"
-        cursor.execute(query)
-    else:
-        query = f"SELECT * FROM {table} WHERE {sync_col} > %s ORDER BY {sync_col}"
-        cursor.execute(query, (since_value,))
+def sync_updates(conn: Any, table: str, manifest: dict[str, Any]) -> int:
+    """Pick up updates to already-synced rows of a mutable table as deltas.
+
+    Rows with a bumped `updated_col` are fetched directly, including the rows
+    this pass appended, so the update watermark passes them and
+    `detect_changed_tables` settles; images identical to the stored rows are
+    dropped, so new rows are not written twice.
+
+    Every UPSERT_CHECKSUM_INTERVAL seconds, per-month checksums of the rows in
+    MySQL are compared with `stored_checksums`, the checksums of the rows as
+    they were fetched, and differing months are re-fetched. Either way only
+    changed rows (or months) are written, never the full table.
+    """
+    sync_col = manifest["sync_col"]
+    watermark = manifest["last_value"]
+    if watermark is None:
+        return 0
+
+    spec = MUTABLE_TABLES[table]
+    updated = 0
+
+    updated_col = spec["updated_col"]
+    if updated_col and manifest.get("update_watermark") is None:
+        # First run: everything synced so far is current
+        manifest["update_watermark"] = (
+            scan_table(table).select(pl.col(updated_col).max()).collect().item()
+        )
+        save_manifest(table, manifest)
+    elif updated_col:
+        since = manifest["update_watermark"]
+        for batch_df in stream_rows(
+            conn,
+            table,
+            f"{updated_col} > %s AND {sync_col} <= %s",
+            (since, watermark),
+            updated_col,
+        ):
+            manifest["update_watermark"] = batch_df[updated_col].max()
+            changed = drop_unchanged(table, manifest, batch_df, updated_col)
+            if changed.is_empty():
+                save_manifest(table, manifest)
+                continue
+            # Their checksums cannot be swapped in (the replaced images' are
+            # unknown), so a month whose other columns changed too gets
+            # re-fetched by the next check
+            updated += write_delta_batches(table, manifest, iter([changed]))
+
+    checked_at = manifest.get("checksum_at")
+    if (
+        checked_at is not None
+        and (datetime.now(UTC) - datetime.fromisoformat(checked_at)).total_seconds()
+        < UPSERT_CHECKSUM_INTERVAL
+    ):
+        return updated
+
+    stored = manifest["stored_checksums"]
+    remote = fetch_range_checksums(conn, table, sync_col, watermark)
+    time_col = TIME_COLUMNS[table]
+    checksums: dict[str, list[int]] = {}
+    for month, checksum in remote.items():
+        if stored is not None and stored.get(month) == checksum:
+            checksums[month] = checksum
+            continue
+        start = datetime.strptime(month, PARTITION_FORMAT)
+        end = (start + timedelta(days=32)).replace(day=1)
+        refetched: dict[str, list[int]] = {}
+        updated += write_delta_batches(
+            table,
+            manifest,
+            strip_checksums(
+                table,
+                stream_rows(
+                    conn,
+                    table,
+                    f"{time_col} >= %s AND {time_col} < %s AND {sync_col} <= %s",
+                    (start, end, watermark),
+                    sync_col,
+                    with_crc=True,
+                ),
+                refetched,
+            ),
+        )
+        checksums[month] = refetched.get(month, [0, 0])
 
-    return cursor.fetchall()  # type: ignore[no-any-return]
+    # Months without rows in MySQL any more drop out of the baseline
+    manifest["stored_checksums"] = checksums
+    manifest["checksum_at"] = datetime.now(UTC).isoformat()
+    save_manifest(table, manifest)
+    return updated
 
 
 def sync_table(conn: Any, table: str, sync_col: str) -> int:
-    """Sync a single table from MySQL to Parquet (atomic write)."""
-    parquet_path = DATA_DIR / f"{table}.parquet"
-    temp_path = DATA_DIR / f".{table}.parquet.tmp"
+    """Sync a single table from MySQL, appending one segment per fetched page.
+
+    Pages arrive ordered by the sync cursor and each one is committed to the
+    manifest, so a crash mid-table leaves a valid prefix behind and the next
+    run resumes after the last committed row.
+    """
+    with table_lock(table):
+        migrate_legacy_file(table)
+        # Segments written under an older (or no) SCHEMA_VERSION get rewritten
+        # once; this changes the dataset size, so get_sync_state then rebuilds
+        # the manifest from a scan
+        manifest = read_manifest(table)
+        if manifest is None or manifest.get("schema_version") != SCHEMA_VERSION:
+            conform_segments(table, TABLE_SCHEMAS[table])
+
+        manifest = get_sync_state(table, sync_col)
+        if manifest.get("schema_version") != SCHEMA_VERSION:
+            manifest["schema_version"] = SCHEMA_VERSION
+            save_manifest(table, manifest)
+        records_synced = 0
+
+        mutable = table in MUTABLE_TABLES
+        if mutable and "stored_checksums" not in manifest:
+            # Rows synced before checksums were tracked have none; the next
+            # check re-fetches them once
+            manifest["stored_checksums"] = {} if manifest["row_count"] == 0 else None
+            manifest.pop("checksums", None)
+            manifest.pop("checksum_watermark", None)
+
+        tiebreaker = SYNC_TIEBREAKERS.get(table)
+        touched_days: set[date] = set()
+        stored_keys = boundary_keys(table, manifest)
+        batches = fetch_new_rows(
+            conn, table, sync_col, manifest["last_value"], stored_keys, mutable
+        )
+        if mutable:
+            # Checksums of the rows as fetched, published with their segments
+            batches = strip_checksums(table, batches, manifest["stored_checksums"])
+        for batch_df in batches:
+            # Atomic per segment: temp file + rename (prevents race conditions)
+            segments = write_segment(table, batch_df)
+            records_synced += batch_df.height
+
+            # Publish the segments and advance the cursor in one manifest write
+            manifest["files"] += [relative_path(table, p) for p in segments]
+            if tiebreaker is not None:
+                # Late rows at the old cursor may sort below its tiebreaker
+                last_value = batch_df[sync_col][-1]
+                keys = batch_df.filter(pl.col(sync_col) == last_value)[tiebreaker]
+                if last_value == manifest["last_value"]:
+                    keys = keys.append(pl.Series([manifest["last_key"]]))
+                manifest["last_key"] = keys.max()
+            manifest["last_value"] = batch_df[sync_col][-1]
+            manifest["row_count"] += batch_df.height
+            save_manifest(table, manifest)
+            touched_days.update(
+                batch_df[TIME_COLUMNS[table]].dt.date().unique().to_list()
+            )
 
-    last_value = get_last_sync_value(parquet_path, sync_col)
-    rows = fetch_new_rows(conn, table, sync_col, last_value)
+        if mutable:
+            records_synced += sync_updates(conn, table, manifest)
 
-    if not rows:
-        return 0
+        # Updates never move rows between days (time columns are immutable),
+        # so only days of new rows change
+        refresh_daily_rollup(table, touched_days, manifest["row_count"])
+
+    return records_synced
+
+
+class ConnectionPool:
+    """Fixed set of DB connections, one per sync worker."""
+
+    def __init__(self, size: int) -> None:
+        self._connections = [pymysql.connect(**DB_CONFIG) for _ in range(size)]
+        self._idle: queue.Queue[Any] = queue.Queue()
+        for conn in self._connections:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection for the duration of the block."""
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
 
-    new_df = pl.DataFrame(rows, infer_schema_length=None)
+    def ping(self) -> None:
+        """Reconnect idle connections the server dropped (daemon mode)."""
+        for conn in self._connections:
+            conn.ping(reconnect=True)
 
-    if parquet_path.exists():
-        existing_df = pl.read_parquet(parquet_path)
-        combined_df = pl.concat([existing_df, new_df])
-    else:
-        combined_df = new_df
+    def close(self) -> None:
+        for conn in self._connections:
+            conn.close()
 
-    # Atomic write: temp file + rename (prevents race conditions)
-    combined_df.write_parquet(temp_path)
-    temp_path.rename(parquet_path)
 
-    return len(rows)
+def sync_table_with_pool(
+    pool: ConnectionPool, table: str, sync_col: str
+) -> dict[str, Any]:
+    """Sync one table on a pooled connection and report its outcome.
+
+    Runs in a worker thread. Errors are returned instead of raised so the
+    caller can account (and report to Sentry) per table.
+    """
+    start = datetime.now()
+    result: dict[str, Any] = {"table": table, "records": 0, "error": None}
+    try:
+        with pool.connection() as conn:
+            result["records"] = sync_table(conn, table, sync_col)
+    except Exception as e:
+        result["error"] = e
+    result["duration"] = (datetime.now() - start).total_seconds()
+    return result
 
 
 def push_uptimekuma(status: str = "up", msg: str = "") -> None:
@@ -126,11 +613,239 @@ def push_uptimekuma(status: str = "up", msg: str = "") -> None:
         print(f"  UptimeKuma: failed to push - {e}")
 
 
-def main() -> None:
+def notify_api() -> None:
+    """Tell the API to recompute its cached response in the background."""
+    if not ANALYTICS_REFRESH_URL or not ANALYTICS_SECRET_TOKEN:
+        return
+
+    try:
+        httpx.post(
+            ANALYTICS_REFRESH_URL,
+            headers={"Authorization": ANALYTICS_SECRET_TOKEN},
+            timeout=5,
+        )
+    except Exception as e:
+        # The API also watches cache_status.txt, so a missed push only delays
+        print(f"  API refresh: failed to notify - {e}")
+
+
+def sync_tables(
+    pool: ConnectionPool, tables: dict[str, str]
+) -> tuple[dict[str, int], list[str]]:
+    """Sync the given tables concurrently; return (records per table, errors)."""
+    table_counts: dict[str, int] = {}
+    errors: list[str] = []
+    if not tables:
+        return table_counts, errors
+
+    with ThreadPoolExecutor(max_workers=min(SYNC_PARALLELISM, len(tables))) as executor:
+        futures = {
+            table: executor.submit(sync_table_with_pool, pool, table, sync_col)
+            for table, sync_col in tables.items()
+        }
+
+        # Collect in TABLES order; breadcrumbs and Sentry reports stay on
+        # the main thread so they end up on the same scope
+        for table, sync_col in tables.items():
+            add_error_breadcrumb(
+                message=f"Syncing table {table}",
+                category="sync",
+                data={"table": table, "sync_col": sync_col},
+            )
+            result = futures[table].result()
+            table_counts[table] = result["records"]
+
+            if result["error"] is None:
+                if result["records"] > 0:
+                    add_error_breadcrumb(
+                        message=f"Synced {result['records']} records from {table}",
+                        category="sync",
+                        data={
+                            "table": table,
+                            "records": result["records"],
+                            "duration": result["duration"],
+                        },
+                    )
+                continue
+
+            error_msg = f"{table}: {result['error']}"
+            print(f"[{datetime.now().isoformat()}] ERROR {error_msg}")
+            errors.append(error_msg)
+            capture_error(
+                result["error"],
+                ErrorContext(
+                    component="update_readmodel",
+                    action="sync_table",
+                    extra={
+                        "table": table,
+                        "sync_col": sync_col,
+                        "error_msg": error_msg,
+                    },
+                ),
+                severity="high",
+            )
+
+    return table_counts, errors
+
+
+def detect_changed_tables(pool: ConnectionPool) -> dict[str, str]:
+    """Return the tables with new or updated rows since their manifest.
+
+    One round trip with a MAX() subquery per sync column (and per update
+    column of mutable tables); on indexed columns these are index lookups, so
+    this is far cheaper than a sync pass. Tables with a tiebreaker also probe
+    the largest tiebreaker at the newest timestamp, which catches most rows
+    that arrived with the same timestamp as the last synced one; the others
+    are fetched with the next newer row, as every sync re-reads that
+    timestamp. Mutable tables are also returned when their range checksum is
+    due.
+    """
+    probes = [
+        (t, f"SELECT MAX({col}) FROM {t}", "last_value") for t, col in TABLES.items()
+    ]
+    probes += [
+        (
+            t,
+            f"SELECT MAX({tiebreaker} COLLATE {TIEBREAKER_COLLATION}) FROM {t} "
+            f"WHERE {TABLES[t]} = (SELECT MAX({TABLES[t]}) FROM {t})",
+            "last_key",
+        )
+        for t, tiebreaker in SYNC_TIEBREAKERS.items()
+    ]
+    probes += [
+        (t, f"SELECT MAX({spec['updated_col']}) FROM {t}", "update_watermark")
+        for t, spec in MUTABLE_TABLES.items()
+        if spec["updated_col"]
+    ]
+    subqueries = ", ".join(f"({query})" for _, query, _ in probes)
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {subqueries}")
+        remote_values = cursor.fetchone()
+        cursor.close()
+
+    changed = {}
+    now = datetime.now(UTC)
+    for (table, _query, field), remote_value in zip(probes, remote_values, strict=True):
+        manifest = read_manifest(table)
+        checksum_at = manifest.get("checksum_at") if manifest else None
+        if (
+            manifest is None
+            or remote_value != manifest.get(field)
+            or (
+                table in MUTABLE_TABLES
+                and checksum_at is not None
+                and (now - datetime.fromisoformat(checksum_at)).total_seconds()
+                >= UPSERT_CHECKSUM_INTERVAL
+            )
+        ):
+            changed[table] = TABLES[table]
+    return changed
+
+
+def bump_table_versions(table_counts: dict[str, int]) -> None:
+    """Record a new data version for every table that changed in this pass.
+
+    The API keys its per-section cache on these, so only dashboard sections
+    reading a changed table are recomputed.
+    """
+    path = DATA_DIR / "table_versions.json"
+    try:
+        versions: dict[str, str] = json.loads(path.read_text())
+    except (OSError, ValueError):
+        versions = {}
+
+    changed = [t for t in TABLES if table_counts.get(t) or t not in versions]
+    if not changed:
+        return
+
+    now = datetime.now(UTC).isoformat()
+    versions.update(dict.fromkeys(changed, now))
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.write_text(json.dumps(versions, indent=2))
+    os.replace(temp_path, path)
+
+
+def update_sessions(errors: list[str]) -> int | None:
+    """Fold new page views and estimations into the materialized sessions.
+
+    Runs once per pass after all tables synced, as sessions read both tables;
+    a no-op when the sessions already include every synced row. Returns the
+    number of re-evaluated sessions, or None if the refresh failed.
+    """
+    try:
+        return refresh_sessions()
+    except Exception as e:
+        error_msg = f"sessions: {e}"
+        print(f"[{datetime.now().isoformat()}] ERROR {error_msg}")
+        errors.append(error_msg)
+        capture_error(
+            e,
+            ErrorContext(
+                component="update_readmodel",
+                action="refresh_sessions",
+                extra={"error_msg": error_msg},
+            ),
+            severity="high",
+        )
+        return None
+
+
+def finish_pass(
+    start_time: datetime, table_counts: dict[str, int], errors: list[str]
+) -> None:
+    """Log, signal the API and push the heartbeat for a finished sync pass."""
+    # Session sources only get a new version once the sessions include their
+    # rows, so the API never caches traffic of new rows with stale sessions
+    refreshed = update_sessions(errors)
+    version_counts = dict(table_counts)
+    for table in SESSION_SOURCES:
+        if refreshed is None:
+            version_counts.pop(table, None)
+        elif refreshed:
+            # Also covers rows of an earlier pass whose refresh failed
+            version_counts[table] = max(version_counts.get(table, 0), 1)
+
+    total_records = sum(table_counts.values())
+    duration = (datetime.now() - start_time).total_seconds()
+
+    # Summary log (always print)
+    error_suffix = f", {len(errors)} errors" if errors else ""
+    print(
+        f"[{datetime.now().isoformat()}] Sync: {total_records} records ({duration:.1f}s){error_suffix}"
+    )
+
+    # Tables that synced fine changed even if others failed
+    bump_table_versions(version_counts)
+
+    # Push to UptimeKuma
+    if errors:
+        push_uptimekuma("down", f"Errors: {', '.join(errors)}")
+        return
+
+    # Write cache invalidation signal for FastAPI (only if data changed)
+    cache_status_path = DATA_DIR / "cache_status.txt"
+    if total_records > 0 or refreshed or not cache_status_path.exists():
+        cache_status_path.write_text(datetime.now(UTC).isoformat())
+        notify_api()
+
+    add_error_breadcrumb(
+        message="Sync completed successfully",
+        category="sync",
+        data={"total_records": total_records, "duration": duration},
+    )
+
+    per_table = ", ".join(f"{t}: {n}" for t, n in table_counts.items() if n)
+    push_uptimekuma(
+        "up",
+        f"Synced {total_records} records in {duration:.1f}s"
+        + (f" ({per_table})" if per_table else ""),
+    )
+
+
+def run_once() -> None:
+    """Single sync pass over all tables (cron / sleep-loop mode)."""
     start_time = datetime.now()
-    DATA_DIR.mkdir(exist_ok=True)
-    total_records = 0
-    errors = []
 
     add_error_breadcrumb(
         message="Starting read model sync",
@@ -138,74 +853,102 @@ def main() -> None:
         data={"tables": list(TABLES.keys())},
     )
 
-    try:
-        conn = pymysql.connect(**DB_CONFIG)
+    parallelism = min(SYNC_PARALLELISM, len(TABLES))
+    pool = ConnectionPool(parallelism)
 
-        add_error_breadcrumb(
-            message="Database connection established",
-            category="database",
-            data={"host": DB_CONFIG["host"]},
-        )
+    add_error_breadcrumb(
+        message="Database connection established",
+        category="database",
+        data={"host": DB_CONFIG["host"], "connections": parallelism},
+    )
 
-        for table, sync_col in TABLES.items():
-            try:
-                add_error_breadcrumb(
-                    message=f"Syncing table {table}",
-                    category="sync",
-                    data={"table": table, "sync_col": sync_col},
-                )
-                records_synced = sync_table(conn, table, sync_col)
-                total_records += records_synced
-                if records_synced > 0:
-                    add_error_breadcrumb(
-                        message=f"Synced {records_synced} records from {table}",
-                        category="sync",
-                        data={"table": table, "records": records_synced},
-                    )
-            except Exception as e:
-                error_msg = f"{table}: {e}"
-                print(f"[{datetime.now().isoformat()}] ERROR {error_msg}")
-                errors.append(error_msg)
-                capture_error(
-                    e,
-                    ErrorContext(
-                        component="update_readmodel",
-                        action="sync_table",
-                        extra={
-                            "table": table,
-                            "sync_col": sync_col,
-                            "error_msg": error_msg,
-                        },
-                    ),
-                    severity="high",
-                )
+    table_counts, errors = sync_tables(pool, TABLES)
+    pool.close()
 
-        conn.close()
-        duration = (datetime.now() - start_time).total_seconds()
+    finish_pass(start_time, table_counts, errors)
+    if errors:
+        sys.exit(1)
 
-        # Summary log (always print)
-        error_suffix = f", {len(errors)} errors" if errors else ""
-        print(
-            f"[{datetime.now().isoformat()}] Sync: {total_records} records ({duration:.1f}s){error_suffix}"
-        )
 
-        # Push to UptimeKuma
-        if errors:
-            push_uptimekuma("down", f"Errors: {', '.join(errors)}")
-            sys.exit(1)
-        else:
-            # Write cache invalidation signal for FastAPI
-            cache_status_path = DATA_DIR / "cache_status.txt"
-            cache_status_path.write_text(datetime.now(UTC).isoformat())
+def run_daemon() -> None:
+    """Keep the process and its connections alive and poll adaptively.
 
-            add_error_breadcrumb(
-                message="Sync completed successfully",
-                category="sync",
-                data={"total_records": total_records, "duration": duration},
+    Each pass first asks MySQL for MAX(sync_col) per table and only syncs the
+    tables that moved. The interval halves while rows keep arriving and
+    doubles while idle, bounded by DAEMON_MIN/MAX_INTERVAL. Every pass pushes
+    the UptimeKuma heartbeat. Compaction runs every COMPACT_INTERVAL seconds in
+    between passes.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    parallelism = min(SYNC_PARALLELISM, len(TABLES))
+    pool = ConnectionPool(parallelism)
+    interval = DAEMON_MIN_INTERVAL
+    last_compaction = time.monotonic()
+
+    add_error_breadcrumb(
+        message="Read model daemon started",
+        category="sync",
+        data={"host": DB_CONFIG["host"], "connections": parallelism},
+    )
+
+    while not stop.is_set():
+        start_time = datetime.now()
+        try:
+            pool.ping()
+            changed = detect_changed_tables(pool)
+            table_counts, errors = sync_tables(pool, changed)
+            if changed or errors:
+                finish_pass(start_time, table_counts, errors)
+            else:
+                # Idle passes still prove the daemon is alive
+                push_uptimekuma("up", "No new rows")
+            synced_rows = sum(table_counts.values()) > 0
+        except Exception as e:
+            print(f"[{datetime.now().isoformat()}] ERROR pass failed: {e}")
+            capture_error(
+                e,
+                ErrorContext(
+                    component="update_readmodel",
+                    action="daemon_pass",
+                    extra={"error_type": type(e).__name__, "interval": interval},
+                ),
+                severity="high",
             )
+            push_uptimekuma("down", str(e))
+            synced_rows = False
+
+        if time.monotonic() - last_compaction >= COMPACT_INTERVAL:
+            compact_all()
+            last_compaction = time.monotonic()
+
+        if synced_rows:
+            interval = max(DAEMON_MIN_INTERVAL, interval / 2)
+        else:
+            interval = min(DAEMON_MAX_INTERVAL, interval * 2)
+        stop.wait(interval)
 
-            push_uptimekuma("up", f"Synced {total_records} records in {duration:.1f}s")
+    pool.close()
 
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and poll MySQL adaptively instead of a single pass",
+    )
+    args = parser.parse_args()
+
+    DATA_DIR.mkdir(exist_ok=True)
+
+    try:
+        if args.daemon:
+            run_daemon()
+        else:
+            run_once()
     except Exception as e:
         print(f"[{datetime.now().isoformat()}] FATAL: {e}")
         capture_error(
@@ -1,17 +1,53 @@
-"""Simple file-based cache invalidation for analytics endpoint."""
+"""Per-section cache for the analytics endpoint, refreshed in the background.
 
+Every dashboard section declares the tables it reads. The updater records a
+version per table in `data/table_versions.json` (and the sync time in
+`data/cache_status.txt`) after every sync that changed data, then notifies the
+API (`POST /internal/refresh`). The API recomputes only the sections whose
+input versions changed, on the calculation executor, and swaps in the new response, so
+requests don't pay for the recomputation. The response is cached as encoded
+bytes (plain and gzip) with an ETag, so hits skip serialization entirely. A
+watcher polling the status files covers missed notifications and warms the
+cache on startup.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import time
+from datetime import date
 from pathlib import Path
 from typing import Any
 
 import sentry_sdk
+from fastapi.encoders import jsonable_encoder
+
+from calculations.plan import collect_plans, explain_plans
+from config import CALC_FUSED_SECTIONS, CALC_PARALLEL_SECTIONS, DATA_DIR
+from util.executor import run_calc
+from util.sentry_wrapper import ErrorContext, capture_error
 
-from config import DATA_DIR
+# {name: {"calc": callable, "plan": callable, "finish": callable, "tables": [...],
+#  "per_day": bool}}; per-day sections depend on the current date as well (their
+# series run up to today). "plan"/"finish" split "calc" into its Polars queries
+# and their post-processing (see calculations.plan).
+Sections = dict[str, dict[str, Any]]
 
+# Section results, their encoded response and the versions they were built from
 _cache: dict[str, Any] = {
-    "response": None,
+    "data": {},
+    "payload": None,
     "timestamp": None,
+    "versions": None,
 }
 
+logger = logging.getLogger("fpp-analytics")
+
+# At most one recomputation in flight; requests and notifications share it
+_refresh: dict[str, asyncio.Task[None] | None] = {"task": None}
+
 
 def get_current_timestamp() -> str | None:
     """Read the cache status timestamp from shared file."""
@@ -24,17 +60,239 @@ def get_current_timestamp() -> str | None:
     return None
 
 
-def get_cached_response() -> tuple[dict[str, Any] | None, bool, str | None]:
-    """Return (cached_response, cache_hit, timestamp). Response is None if stale/missing."""
+def get_table_versions() -> dict[str, str]:
+    """Read the per-table data versions written by the updater."""
+    versions_file = Path(DATA_DIR) / "table_versions.json"
+    try:
+        if versions_file.exists():
+            versions: dict[str, str] = json.loads(versions_file.read_text())
+            return versions
+    except (OSError, ValueError) as e:
+        sentry_sdk.capture_exception(e)
+    return {}
+
+
+def get_section_versions(sections: Sections, timestamp: str) -> dict[str, str]:
+    """Version of each section: the versions of its input tables.
+
+    Tables without a recorded version fall back to the global timestamp, i.e.
+    every sync invalidates them.
+    """
+    table_versions = get_table_versions()
+    today = date.today().isoformat()
+    versions = {}
+    for name, section in sections.items():
+        parts = [table_versions.get(t, timestamp) for t in section["tables"]]
+        if section["per_day"]:
+            parts.append(today)
+        versions[name] = "|".join(parts)
+    return versions
+
+
+def get_cached_response(
+    sections: Sections,
+) -> tuple[dict[str, Any] | None, bool, str | None]:
+    """Return (cached_payload, cache_hit, timestamp). Payload is None if stale/missing."""
     current_ts = get_current_timestamp()
     if current_ts is None:
         return None, False, None
-    if _cache["timestamp"] == current_ts and _cache["response"] is not None:
-        return _cache["response"], True, current_ts
+    if (
+        _cache["payload"] is not None
+        and _cache["timestamp"] == current_ts
+        and _cache["versions"] == get_section_versions(sections, current_ts)
+    ):
+        return _cache["payload"], True, current_ts
     return None, False, current_ts
 
 
-def set_cached_response(response: dict[str, Any], timestamp: str) -> None:
-    """Cache the response with the given timestamp."""
-    _cache["response"] = response
+def get_last_response() -> dict[str, Any] | None:
+    """Return the most recently encoded payload, possibly stale."""
+    payload: dict[str, Any] | None = _cache["payload"]
+    return payload
+
+
+async def _timed_section(sections: Sections, name: str) -> tuple[Any, float]:
+    """Run one section calculation and return (result, seconds)."""
+    start = time.perf_counter()
+    result = await run_calc(sections[name]["calc"])
+    return result, time.perf_counter() - start
+
+
+def _fused_sections(sections: Sections, names: list[str]) -> dict[str, Any]:
+    """Collect the sections' plans in one fused query, then finish each."""
+    frames = collect_plans({name: sections[name]["plan"]() for name in names})
+    return {name: sections[name]["finish"](frames[name]) for name in names}
+
+
+def explain_sections(sections: Sections) -> str:
+    """Combined optimized plan of the sections' queries (blocking)."""
+    return explain_plans(
+        {name: section["plan"]() for name, section in sections.items()}
+    )
+
+
+async def _timed_fused(
+    sections: Sections, names: list[str]
+) -> list[tuple[Any, float] | BaseException]:
+    """Run the sections as one fused calculation; all share its outcome."""
+    start = time.perf_counter()
+    try:
+        results = await run_calc(_fused_sections, sections, names)
+    except Exception as e:
+        return [e] * len(names)
+    seconds = time.perf_counter() - start
+    return [(results[name], seconds) for name in names]
+
+
+async def compute_sections(
+    sections: Sections, names: list[str]
+) -> tuple[dict[str, Any], dict[str, Exception]]:
+    """Run the calculations of the given sections on the calculation executor.
+
+    With CALC_PARALLEL_SECTIONS the sections run concurrently (bounded by the
+    executor size), so a cold refresh takes about as long as the slowest one.
+    With CALC_FUSED_SECTIONS their queries are collected as one Polars plan.
+    Returns (results, errors); a failing section doesn't discard the others.
+    """
+    outcomes: list[tuple[Any, float] | BaseException] = []
+    if CALC_FUSED_SECTIONS:
+        outcomes = await _timed_fused(sections, names) if names else []
+    elif CALC_PARALLEL_SECTIONS:
+        outcomes = await asyncio.gather(
+            *(_timed_section(sections, name) for name in names),
+            return_exceptions=True,
+        )
+    else:
+        for name in names:
+            try:
+                outcomes.append(await _timed_section(sections, name))
+            except Exception as e:
+                outcomes.append(e)
+
+    results: dict[str, Any] = {}
+    errors: dict[str, Exception] = {}
+    durations: dict[str, float] = {}
+    for name, outcome in zip(names, outcomes, strict=True):
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, Exception):
+                # Cancellation and interpreter exits are not section failures
+                raise outcome
+            errors[name] = outcome
+            capture_error(
+                outcome,
+                ErrorContext(
+                    component="cache",
+                    action="compute_section",
+                    extra={"section": name},
+                ),
+                severity="high",
+            )
+            continue
+        results[name], seconds = outcome
+        durations[name] = round(seconds * 1000, 1)
+
+    if names:
+        logger.info(
+            f"Computed {len(results)}/{len(names)} analytics sections",
+            extra={
+                "component": "cache",
+                "action": "compute_sections",
+                "durations": durations,
+                "errors": list(errors),
+            },
+        )
+    return results, errors
+
+
+def encode_payload(data: dict[str, Any], timestamp: str | None) -> dict[str, Any]:
+    """Encode a response once: JSON bytes, a gzip variant and a strong ETag each.
+
+    Same JSON as FastAPI's default response, so cache hits only copy bytes.
+    """
+    body = json.dumps(
+        jsonable_encoder({"data": data, "data_updated_at": timestamp}),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=6),
+        "etag": f'"{digest}"',
+        "gzip_etag": f'"{digest}-gz"',
+    }
+
+
+async def _refresh_response(sections: Sections) -> None:
+    """Recompute the sections whose input versions changed since the last refresh."""
+    timestamp = get_current_timestamp()
+    if timestamp is None:
+        return
+    versions = get_section_versions(sections, timestamp)
+    previous = _cache["versions"] or {}
+    if (
+        _cache["payload"] is not None
+        and previous == versions
+        and _cache["timestamp"] == timestamp
+    ):
+        return
+
+    stale = [name for name in sections if previous.get(name) != versions[name]]
+    fresh, errors = await compute_sections(sections, stale)
+
+    # Keep what succeeded; failed sections keep their previous result and
+    # version, so the next refresh retries only them
+    _cache["data"] = {**_cache["data"], **fresh}
+    _cache["versions"] = {
+        name: versions[name] if name not in errors else previous[name]
+        for name in sections
+        if name not in errors or name in previous
+    }
+    missing = [name for name in sections if name not in _cache["data"]]
+    if missing:
+        raise errors[missing[0]]
+
+    data = {name: _cache["data"][name] for name in sections}
+    # Encoding a few hundred KB of JSON is CPU-bound too
+    _cache["payload"] = await run_calc(encode_payload, data, timestamp)
     _cache["timestamp"] = timestamp
+
+
+def schedule_refresh(sections: Sections) -> asyncio.Task[None]:
+    """Start a background refresh, or return the one already in flight."""
+    task = _refresh["task"]
+    if task is None or task.done():
+        task = asyncio.create_task(_refresh_response(sections))
+        _refresh["task"] = task
+    return task
+
+
+async def refresh_cache(sections: Sections) -> None:
+    """Wait for the cache to be refreshed to the current versions.
+
+    Joins the refresh in flight instead of computing again. If that one started
+    before the latest sync, waits for exactly one follow-up refresh. Shielded,
+    so a disconnecting client doesn't cancel the shared refresh.
+    """
+    await asyncio.shield(schedule_refresh(sections))
+    cached, _, timestamp = get_cached_response(sections)
+    if cached is None and timestamp is not None:
+        await asyncio.shield(schedule_refresh(sections))
+
+
+async def watch_cache_status(sections: Sections, interval: float) -> None:
+    """Refresh the cache whenever the status files change (runs until cancelled).
+
+    The first iteration warms the cache on startup.
+    """
+    while True:
+        try:
+            await refresh_cache(sections)
+        except Exception as e:
+            capture_error(
+                e,
+                ErrorContext(component="cache", action="watch_cache_status"),
+                severity="high",
+            )
+        await asyncio.sleep(interval)
@@ -0,0 +1,39 @@
+"""Executor for the calculation layer, so Polars work never blocks the event loop.
+
+Polars releases the GIL, so calculations run on a thread pool. Its size bounds
+how many calculations run at once.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+from config import CALC_THREADS
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the calculation pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=CALC_THREADS, thread_name_prefix="calc"
+        )
+    return _executor
+
+
+async def run_calc(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking calculation on the executor and await the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args))
+
+
+def shutdown_executor() -> None:
+    """Stop the pool (application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
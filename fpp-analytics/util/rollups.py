@@ -0,0 +1,108 @@
+"""Per-day rollups of the read model tables, maintained by the updater.
+
+Each table gets `data/<table>/_daily.parquet` with one row per day: the row
+count plus a few distinct counts and sums. After a sync only the days touched
+by the new rows are recomputed from the raw segments, so dashboards read a few
+hundred rollup rows instead of scanning every event.
+"""
+
+import os
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from util.storage import TIME_COLUMNS, scan_table, table_dir
+
+ROLLUP_NAME = "_daily.parquet"
+
+# Metrics per day and table; "rows" is required (used as consistency check)
+DAILY_ROLLUPS: dict[str, list[pl.Expr]] = {
+    "fpp_estimations": [
+        pl.len().alias("rows"),
+        pl.col("user_id").n_unique().alias("users"),
+        pl.col("room_id").n_unique().alias("rooms"),
+        pl.col("spectator").sum().alias("spectators"),
+    ],
+    "fpp_events": [
+        pl.len().alias("rows"),
+        pl.col("user_id").n_unique().alias("users"),
+    ],
+    "fpp_page_views": [
+        pl.len().alias("rows"),
+        pl.col("user_id").n_unique().alias("users"),
+        pl.col("room_id").n_unique().alias("rooms"),
+    ],
+    "fpp_rooms": [
+        pl.len().alias("rows"),
+    ],
+    "fpp_votes": [
+        pl.len().alias("rows"),
+        pl.col("room_id").n_unique().alias("rooms"),
+        pl.col("amount_of_estimations").sum().alias("estimations"),
+        pl.col("amount_of_spectators").sum().alias("spectators"),
+    ],
+    "fpp_users": [
+        pl.len().alias("rows"),
+    ],
+}
+
+
+def rollup_path(table: str) -> Path:
+    """Return the location of a table's daily rollup."""
+    return table_dir(table) / ROLLUP_NAME
+
+
+def compute_daily_rollup(table: str, lf: pl.LazyFrame) -> pl.DataFrame:
+    """Aggregate raw rows into one row per day."""
+    return (
+        lf.group_by(pl.col(TIME_COLUMNS[table]).dt.date().alias("day"))
+        .agg(DAILY_ROLLUPS[table])
+        .sort("day")
+        .collect()
+    )
+
+
+def refresh_daily_rollup(table: str, days: set[date], row_count: int) -> int:
+    """Recompute the rollup for the given days and return how many were refreshed.
+
+    The rollup is rebuilt from scratch when it is missing or its row counts no
+    longer add up to the table's row count. Callers must hold the table lock.
+    """
+    path = rollup_path(table)
+    existing = pl.read_parquet(path) if path.exists() else None
+    rollup = existing
+
+    if existing is not None and days:
+        # Range predicate first, so scans skip row groups outside the days
+        time_col = pl.col(TIME_COLUMNS[table])
+        touched = scan_table(table).filter(
+            (time_col >= datetime.combine(min(days), time.min))
+            & (time_col < datetime.combine(max(days) + timedelta(days=1), time.min))
+            & time_col.dt.date().is_in(sorted(days))
+        )
+        rollup = pl.concat(
+            [
+                existing.filter(~pl.col("day").is_in(sorted(days))),
+                compute_daily_rollup(table, touched),
+            ]
+        ).sort("day")
+
+    refreshed = len(days)
+    if rollup is None or rollup["rows"].sum() != row_count:
+        rollup = compute_daily_rollup(table, scan_table(table))
+        refreshed = rollup.height
+
+    if rollup is not existing:
+        temp_path = path.with_name(f".{ROLLUP_NAME}.tmp")
+        rollup.write_parquet(temp_path)
+        os.replace(temp_path, path)
+    return refreshed
+
+
+def read_daily_rollup(table: str) -> pl.DataFrame:
+    """Read a table's daily rollup, computing it from raw rows if missing."""
+    path = rollup_path(table)
+    if path.exists():
+        return pl.read_parquet(path)
+    return compute_daily_rollup(table, scan_table(table))
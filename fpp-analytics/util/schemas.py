@@ -0,0 +1,79 @@
+"""Declared Parquet schemas of the read model tables.
+
+Mirrors the MySQL columns in src/server/db/schema.ts with the tightest
+matching Polars dtypes, so every synced segment has identical dtypes.
+"""
+
+import polars as pl
+
+TIMESTAMP = pl.Datetime("us")
+
+# Recorded in each table manifest; bump when TABLE_SCHEMAS changes so the
+# updater conforms the existing segments once
+SCHEMA_VERSION = 1
+
+TABLE_SCHEMAS: dict[str, pl.Schema] = {
+    "fpp_estimations": pl.Schema(
+        {
+            "id": pl.Int32(),
+            "user_id": pl.String(),
+            "room_id": pl.Int32(),
+            "estimation": pl.Int16(),
+            "spectator": pl.Boolean(),
+            "estimated_at": TIMESTAMP,
+        }
+    ),
+    "fpp_events": pl.Schema(
+        {
+            "id": pl.Int32(),
+            "user_id": pl.String(),
+            "event": pl.Categorical(),
+            "event_at": TIMESTAMP,
+        }
+    ),
+    "fpp_page_views": pl.Schema(
+        {
+            "id": pl.Int32(),
+            "user_id": pl.String(),
+            "route": pl.Categorical(),
+            "room_id": pl.Int32(),
+            "source": pl.String(),
+            "viewed_at": TIMESTAMP,
+        }
+    ),
+    "fpp_rooms": pl.Schema(
+        {
+            "id": pl.Int32(),
+            "number": pl.Int32(),
+            "name": pl.String(),
+            "first_used_at": TIMESTAMP,
+            "last_used_at": TIMESTAMP,
+        }
+    ),
+    "fpp_votes": pl.Schema(
+        {
+            "id": pl.Int32(),
+            "room_id": pl.Int32(),
+            "avg_estimation": pl.Decimal(4, 2),
+            "max_estimation": pl.Int16(),
+            "min_estimation": pl.Int16(),
+            "amount_of_estimations": pl.Int16(),
+            "amount_of_spectators": pl.Int16(),
+            "duration": pl.Int16(),
+            "was_auto_flip": pl.Boolean(),
+            "voted_at": TIMESTAMP,
+        }
+    ),
+    "fpp_users": pl.Schema(
+        {
+            "id": pl.String(),
+            "device": pl.String(),
+            "os": pl.String(),
+            "browser": pl.String(),
+            "country": pl.String(),
+            "region": pl.String(),
+            "city": pl.String(),
+            "created_at": TIMESTAMP,
+        }
+    ),
+}
@@ -0,0 +1,188 @@
+"""Materialized user sessions for the traffic statistics, maintained by the updater.
+
+Page views and estimations after START_DATE form sessions per user: activity
+at most SESSION_GAP apart belongs to the same session. `data/_sessions.parquet`
+holds one row per session (user_id, session_start, session_end, events,
+estimated: whether it includes an estimation); its Parquet metadata records the last id of each source table it includes. After a
+sync only the new rows and the sessions of their users they can extend or
+merge are re-evaluated, so the API never sorts the full activity history.
+"""
+
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+
+from config import DATA_DIR, START_DATE
+from util.storage import TIME_COLUMNS, read_manifest, scan_table
+
+SESSIONS_NAME = "_sessions.parquet"
+
+# Tables whose rows count as user activity, and the column their sync id is in
+SESSION_SOURCES = {"fpp_page_views": "id", "fpp_estimations": "id"}
+
+# Activity from this table marks a session as estimated (for the bounce rate)
+ESTIMATION_SOURCE = "fpp_estimations"
+
+# Activity further apart than this starts a new session
+SESSION_GAP = timedelta(minutes=10)
+
+
+def sessions_path() -> Path:
+    """Return the location of the materialized sessions."""
+    return Path(DATA_DIR) / SESSIONS_NAME
+
+
+def _activity(sources: dict[str, pl.LazyFrame]) -> pl.LazyFrame:
+    """User activity (user_id, activity_at, estimated) after START_DATE."""
+    start_ts = pl.lit(START_DATE).str.to_datetime()
+    return pl.concat(
+        [
+            lf.select(
+                "user_id",
+                pl.col(TIME_COLUMNS[table]).alias("activity_at"),
+                pl.lit(table == ESTIMATION_SOURCE).alias("estimated"),
+            ).filter(pl.col("activity_at") > start_ts)
+            for table, lf in sources.items()
+        ]
+    )
+
+
+def compute_sessions(activity: pl.LazyFrame) -> pl.LazyFrame:
+    """Group activity into sessions: per user, gaps above SESSION_GAP split them."""
+    return (
+        activity.sort(["user_id", "activity_at"])
+        .with_columns(
+            (
+                pl.col("activity_at").diff().over("user_id").is_null()
+                | (pl.col("activity_at").diff().over("user_id") > SESSION_GAP)
+            )
+            .cum_sum()
+            .alias("session")
+        )
+        .group_by("session")
+        .agg(
+            pl.col("user_id").first(),
+            pl.col("activity_at").min().alias("session_start"),
+            pl.col("activity_at").max().alias("session_end"),
+            pl.len().cast(pl.UInt32).alias("events"),
+            pl.col("estimated").any(),
+        )
+        .drop("session")
+    )
+
+
+def _write_sessions(sessions: pl.DataFrame, watermarks: dict[str, int]) -> None:
+    """Atomically replace the sessions file, recording the included source ids."""
+    path = sessions_path()
+    temp_path = path.with_name(f".{SESSIONS_NAME}.tmp")
+    sessions.write_parquet(
+        temp_path, metadata={table: str(wm) for table, wm in watermarks.items()}
+    )
+    os.replace(temp_path, path)
+
+
+def _read_watermarks(path: Path) -> dict[str, int] | None:
+    """Source ids recorded in a sessions file, or None if unusable.
+
+    Files written before sessions carried the `estimated` flag are unusable.
+    """
+    try:
+        if "estimated" not in pl.read_parquet_schema(path):
+            return None
+        metadata = pl.read_parquet_metadata(path)
+        return {table: int(metadata[table]) for table in SESSION_SOURCES}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def refresh_sessions() -> int:
+    """Fold new source rows into the sessions and return how many were re-evaluated.
+
+    Sessions of users with new activity that end more than SESSION_GAP before
+    their earliest new activity cannot change; the rest of those users'
+    sessions is recomputed from raw rows. Rebuilds from scratch when the file
+    is missing or a source table was rebuilt since.
+    """
+    manifests: dict[str, dict[str, Any]] = {}
+    for table in SESSION_SOURCES:
+        manifest = read_manifest(table)
+        if manifest is None or manifest["last_value"] is None:
+            return 0
+        manifests[table] = manifest
+    watermarks = {table: int(m["last_value"]) for table, m in manifests.items()}
+    sources = {table: scan_table(table, m) for table, m in manifests.items()}
+
+    path = sessions_path()
+    previous = _read_watermarks(path) if path.exists() else None
+    if previous is None or any(previous[t] > watermarks[t] for t in SESSION_SOURCES):
+        sessions = compute_sessions(_activity(sources)).collect()
+        _write_sessions(sessions, watermarks)
+        return sessions.height
+    if previous == watermarks:
+        return 0
+
+    new_activity = _activity(
+        {
+            table: lf.filter(pl.col(SESSION_SOURCES[table]) > previous[table])
+            for table, lf in sources.items()
+        }
+    ).collect()
+    existing = pl.read_parquet(path)
+    if new_activity.is_empty():
+        _write_sessions(existing, watermarks)
+        return 0
+
+    # Per user the sessions new activity can extend or merge, and where to
+    # recompute from
+    first_new = new_activity.group_by("user_id").agg(
+        pl.col("activity_at").min().alias("first_new")
+    )
+    flagged = existing.join(
+        first_new, on="user_id", how="left", nulls_equal=True
+    ).with_columns(
+        (pl.col("session_end") >= pl.col("first_new") - SESSION_GAP)
+        .fill_null(False)
+        .alias("reopen")
+    )
+    recompute_from = (
+        pl.concat(
+            [
+                flagged.filter("reopen").select(
+                    "user_id", pl.col("session_start").alias("since")
+                ),
+                first_new.rename({"first_new": "since"}),
+            ]
+        )
+        .group_by("user_id")
+        .agg(pl.col("since").min())
+    )
+
+    # Raw activity of those users from that point; their earlier sessions all
+    # end before it, so nothing is counted twice
+    activity = (
+        _activity(sources)
+        .filter(pl.col("activity_at") >= recompute_from["since"].min())
+        .join(recompute_from.lazy(), on="user_id", nulls_equal=True)
+        .filter(pl.col("activity_at") >= pl.col("since"))
+        .drop("since")
+    )
+    recomputed = compute_sessions(activity).collect()
+
+    sessions = pl.concat(
+        [flagged.filter(~pl.col("reopen")).select(existing.columns), recomputed]
+    )
+    _write_sessions(sessions, watermarks)
+    return recomputed.height
+
+
+def read_sessions() -> pl.LazyFrame:
+    """Read the materialized sessions, computing them from raw rows if missing."""
+    path = sessions_path()
+    if path.exists() and _read_watermarks(path) is not None:
+        return pl.scan_parquet(path)
+    return compute_sessions(
+        _activity({table: scan_table(table) for table in SESSION_SOURCES})
+    )
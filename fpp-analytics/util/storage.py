@@ -0,0 +1,403 @@
+"""Append-only, month-partitioned Parquet dataset layout for the read model.
+
+Each table lives in its own directory with hive-style partitions:
+
+    data/fpp_votes/month=2024-06/part-20240603T101500-1a2b3c4d.parquet
+
+The updater appends one segment per sync batch. Next to the partitions,
+`_manifest.json` lists the live segments plus the sync watermark and is the
+commit point: readers scan exactly the files it lists, so compaction can swap
+segments for a compacted file with a single atomic manifest replace.
+
+Mutable tables additionally get delta files under `_deltas/` holding full row
+images of updated rows. Readers resolve them by primary key (latest delta
+wins) and compaction folds them back into the partitions.
+"""
+
+import fcntl
+import json
+import os
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, TypedDict
+
+import polars as pl
+
+from config import DATA_DIR
+from util.schemas import TABLE_SCHEMAS
+
+# Time column used for partitioning (and later for sorting/compaction)
+TIME_COLUMNS = {
+    "fpp_estimations": "estimated_at",
+    "fpp_events": "event_at",
+    "fpp_page_views": "viewed_at",
+    "fpp_rooms": "first_used_at",
+    "fpp_votes": "voted_at",
+    "fpp_users": "created_at",
+}
+
+
+class MutableTable(TypedDict):
+    """Primary key and the column bumped on update of a mutable table."""
+
+    key: str
+    # None = changes are only found by the periodic range checksum
+    updated_col: str | None
+
+
+# Tables whose rows change after insert
+MUTABLE_TABLES: dict[str, MutableTable] = {
+    "fpp_rooms": {"key": "id", "updated_col": "last_used_at"},
+    "fpp_users": {"key": "id", "updated_col": None},
+}
+
+PARTITION_KEY = "month"
+PARTITION_FORMAT = "%Y-%m"
+DELTA_DIR = "_deltas"
+MANIFEST_NAME = "_manifest.json"
+LOCK_NAME = "_lock"
+
+# Manifest fields holding DB values (datetimes need a typed JSON encoding)
+WATERMARK_FIELDS = (
+    "last_value",
+    "last_key",
+    "update_watermark",
+)
+
+
+def table_dir(table: str) -> Path:
+    """Return the dataset directory of a table."""
+    return Path(DATA_DIR) / table
+
+
+def legacy_file(table: str) -> Path:
+    """Return the pre-dataset single-file location of a table."""
+    return Path(DATA_DIR) / f"{table}.parquet"
+
+
+def dataset_files(table: str) -> list[Path]:
+    """List all segment files on disk, including ones not (yet) in the manifest."""
+    return sorted(table_dir(table).glob(f"{PARTITION_KEY}=*/*.parquet"))
+
+
+def relative_path(table: str, path: Path) -> str:
+    """Path of a segment relative to its table directory, as stored in manifests."""
+    return path.relative_to(table_dir(table)).as_posix()
+
+
+def live_files(table: str, manifest: dict[str, Any] | None = None) -> list[Path]:
+    """Segments of the current snapshot (manifest), falling back to a glob."""
+    if manifest is None:
+        manifest = read_manifest(table)
+    if manifest is None:
+        return dataset_files(table)
+    return [table_dir(table) / f for f in manifest["files"]]
+
+
+def table_exists(table: str) -> bool:
+    """Check whether a table has at least one committed segment."""
+    return bool(live_files(table))
+
+
+def table_size_bytes(table: str) -> int:
+    """Total on-disk size of all live segments of a table."""
+    return sum(f.stat().st_size for f in live_files(table))
+
+
+def merge_deltas(base: pl.LazyFrame, deltas: list[Path], key: str) -> pl.LazyFrame:
+    """Resolve delta row images over a base frame; the latest version wins."""
+    latest = (
+        pl.concat(
+            [
+                pl.scan_parquet(path).with_columns(pl.lit(seq).alias("__delta_seq"))
+                for seq, path in enumerate(deltas)
+            ]
+        )
+        .sort("__delta_seq", maintain_order=True)
+        .unique(subset=key, keep="last")
+        .drop("__delta_seq")
+    )
+    return pl.concat([base.join(latest.select(key), on=key, how="anti"), latest])
+
+
+def scan_table(table: str, manifest: dict[str, Any] | None = None) -> pl.LazyFrame:
+    """Lazily scan all live segments of a table as a single frame.
+
+    For mutable tables pending deltas are merged in, keyed by primary key.
+    Pass an already read manifest to scan exactly that snapshot.
+    """
+    # One manifest read, so segments and deltas come from the same snapshot
+    if manifest is None:
+        manifest = read_manifest(table)
+    return _scan_files(table, manifest, live_files(table, manifest))
+
+
+def to_storage_time(value: datetime | None) -> datetime | None:
+    """Convert a timezone-aware datetime to the naive local time rows are stored in."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def scan_table_range(
+    table: str,
+    start: datetime | None,
+    end: datetime | None,
+    manifest: dict[str, Any] | None = None,
+) -> pl.LazyFrame:
+    """Lazily scan the rows of a table whose time column is in [start, end).
+
+    Only segments of month partitions overlapping the window are opened, and
+    the time predicate is pushed into the Parquet scan, so row groups outside
+    the window are skipped by their statistics.
+    """
+    if manifest is None:
+        manifest = read_manifest(table)
+    in_range = [
+        f for f in live_files(table, manifest) if _partition_overlaps(f, start, end)
+    ]
+
+    lf = _scan_files(table, manifest, in_range)
+    time_col = pl.col(TIME_COLUMNS[table])
+    if start is not None:
+        lf = lf.filter(time_col >= start)
+    if end is not None:
+        lf = lf.filter(time_col < end)
+    return lf
+
+
+def _partition_overlaps(
+    path: Path, start: datetime | None, end: datetime | None
+) -> bool:
+    """Check whether a segment's month partition can hold rows in [start, end)."""
+    key, _, value = path.parent.name.partition("=")
+    if key != PARTITION_KEY:
+        return True  # legacy single file: always scan
+    try:
+        month_start = datetime.strptime(value, PARTITION_FORMAT)
+    except ValueError:
+        return True
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+    if start is not None and month_end <= start:
+        return False
+    return end is None or month_start < end
+
+
+def _scan_files(
+    table: str, manifest: dict[str, Any] | None, files: list[Path]
+) -> pl.LazyFrame:
+    """Scan the given segments, merging the snapshot's deltas for mutable tables."""
+    if files:
+        lf = pl.scan_parquet(files, hive_partitioning=False)
+    else:
+        # No segment to take the schema from (empty table or window)
+        lf = pl.LazyFrame(schema=TABLE_SCHEMAS[table])
+    if manifest is None or not manifest["deltas"] or table not in MUTABLE_TABLES:
+        return lf
+    deltas = [table_dir(table) / f for f in manifest["deltas"]]
+    return merge_deltas(lf, deltas, MUTABLE_TABLES[table]["key"])
+
+
+@contextmanager
+def table_lock(table: str) -> Iterator[None]:
+    """Exclusive per-table lock between the updater and compaction."""
+    directory = table_dir(table)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_NAME, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_segment(table: str, df: pl.DataFrame) -> list[Path]:
+    """Append rows as new segment files, one per touched partition.
+
+    Each segment is written to a hidden temp file and renamed into place, so
+    readers never see partially written files.
+    """
+    if df.is_empty():
+        return []
+
+    time_col = TIME_COLUMNS[table]
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    written = []
+
+    partitions = df.with_columns(
+        pl.col(time_col).dt.strftime(PARTITION_FORMAT).alias("__partition")
+    ).partition_by("__partition", as_dict=True, include_key=False)
+
+    for (partition,), part_df in partitions.items():
+        partition_dir = table_dir(table) / f"{PARTITION_KEY}={partition}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+
+        name = f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+        segment_path = partition_dir / name
+        temp_path = partition_dir / f".{name}.tmp"
+
+        part_df.write_parquet(temp_path)
+        temp_path.rename(segment_path)
+        written.append(segment_path)
+
+    return written
+
+
+def write_delta(table: str, df: pl.DataFrame) -> Path:
+    """Write updated row images of a mutable table as a new delta file."""
+    delta_dir = table_dir(table) / DELTA_DIR
+    delta_dir.mkdir(parents=True, exist_ok=True)
+
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    name = f"delta-{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+    delta_path = delta_dir / name
+    temp_path = delta_dir / f".{name}.tmp"
+
+    df.write_parquet(temp_path)
+    temp_path.rename(delta_path)
+    return delta_path
+
+
+def conform_segments(table: str, schema: pl.Schema) -> int:
+    """Rewrite segments whose dtypes differ from the declared schema.
+
+    A one-off migration for segments written before the schema was declared.
+    Returns the number of rewritten segments.
+    """
+    rewritten = 0
+    for path in live_files(table):
+        if pl.read_parquet_schema(path) == dict(schema):
+            continue
+        temp_path = path.with_name(f".{path.name}.tmp")
+        pl.read_parquet(path).select(schema.names()).cast(schema).write_parquet(
+            temp_path
+        )
+        os.replace(temp_path, path)
+        rewritten += 1
+    return rewritten
+
+
+def _encode_value(value: Any) -> dict[str, Any]:
+    """Encode a watermark value as JSON, keeping its type."""
+    if isinstance(value, datetime):
+        return {"type": "datetime", "value": value.isoformat()}
+    if value is None:
+        return {"type": "none", "value": None}
+    return {"type": type(value).__name__, "value": value}
+
+
+def _decode_value(encoded: dict[str, Any]) -> Any:
+    """Decode a watermark value written by `_encode_value`."""
+    if encoded["type"] == "datetime":
+        return datetime.fromisoformat(encoded["value"])
+    return encoded["value"]
+
+
+def read_manifest(table: str) -> dict[str, Any] | None:
+    """Read the table manifest, or None if missing or unreadable."""
+    path = table_dir(table) / MANIFEST_NAME
+    try:
+        manifest: dict[str, Any] = json.loads(path.read_text())
+        manifest["last_value"] = _decode_value(manifest["last_value"])
+        for field in WATERMARK_FIELDS[1:]:
+            if field in manifest:
+                manifest[field] = _decode_value(manifest[field])
+        if not isinstance(manifest["files"], list):
+            return None
+        manifest.setdefault("deltas", [])
+        manifest.setdefault("obsolete", [])
+        return manifest
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def new_manifest(
+    table: str, sync_col: str, last_value: Any, row_count: int, files: list[Path]
+) -> dict[str, Any]:
+    """Create an (unsaved) manifest for the given live segments."""
+    return {
+        "table": table,
+        "sync_col": sync_col,
+        "last_value": last_value,
+        "row_count": row_count,
+        "files": [relative_path(table, f) for f in files],
+        "deltas": [],
+        "obsolete": [],
+    }
+
+
+def save_manifest(table: str, manifest: dict[str, Any]) -> None:
+    """Atomically write the manifest, publishing its file list to readers."""
+    directory = table_dir(table)
+    manifest["segments"] = len(manifest["files"])
+    manifest["size_bytes"] = sum(
+        (directory / f).stat().st_size for f in manifest["files"] + manifest["deltas"]
+    )
+    manifest["written_at"] = datetime.now(UTC).isoformat()
+
+    directory.mkdir(parents=True, exist_ok=True)
+    temp_path = directory / f".{MANIFEST_NAME}.tmp"
+    payload = {
+        **manifest,
+        **{f: _encode_value(manifest[f]) for f in WATERMARK_FIELDS if f in manifest},
+    }
+    temp_path.write_text(json.dumps(payload, indent=2))
+    os.replace(temp_path, directory / MANIFEST_NAME)
+
+
+def manifest_matches_dataset(manifest: dict[str, Any], table: str) -> bool:
+    """Cheap consistency check: listed segments exist with the recorded size."""
+    directory = table_dir(table)
+    try:
+        size = sum(
+            (directory / f).stat().st_size
+            for f in manifest["files"] + manifest["deltas"]
+        )
+    except OSError:
+        return False
+    return bool(size == manifest.get("size_bytes"))
+
+
+def remove_orphan_segments(table: str, manifest: dict[str, Any]) -> int:
+    """Delete segments on disk that no manifest references.
+
+    These are left behind when a writer crashes between writing a segment and
+    saving the manifest. Callers must hold the table lock.
+    """
+    known = (
+        set(manifest["files"])
+        | set(manifest["deltas"])
+        | {o["path"] for o in manifest["obsolete"]}
+    )
+    on_disk = dataset_files(table) + sorted(
+        (table_dir(table) / DELTA_DIR).glob("*.parquet")
+    )
+    removed = 0
+    for path in on_disk:
+        if relative_path(table, path) not in known:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def purge_obsolete(table: str, manifest: dict[str, Any], grace_seconds: int) -> int:
+    """Delete replaced segments once in-flight readers had time to finish.
+
+    Returns the number of bytes freed. The caller saves the manifest.
+    """
+    cutoff = datetime.now(UTC) - timedelta(seconds=grace_seconds)
+    remaining = []
+    freed = 0
+    for entry in manifest["obsolete"]:
+        if datetime.fromisoformat(entry["since"]) > cutoff:
+            remaining.append(entry)
+            continue
+        path = table_dir(table) / entry["path"]
+        if path.exists():
+            freed += path.stat().st_size
+            path.unlink()
+    manifest["obsolete"] = remaining
+    return freed
@@ -0,0 +1,167 @@
+"""Process-wide in-memory store of the read model tables for the API.
+
+Calculations used to scan the same Parquet segments again for every section
+that reads a table. The store loads each table once per data version (its
+manifest's segment and delta list), projected to the columns the API reads,
+and hands out lazy frames over the shared in-memory data. A table is reloaded
+when its manifest changes; least recently used tables are evicted when the
+store exceeds TABLE_STORE_MAX_MB. Point lookups (e.g. one room's votes) use a
+per-version index of the stored table: its row numbers ordered by the key
+column and the keys in that order, so a lookup binary-searches the keys and
+gathers a few rows instead of filtering the whole table. Indexes count towards
+TABLE_STORE_MAX_MB and are dropped with their table; tables too large for the
+store are filtered instead.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import polars as pl
+
+from config import TABLE_STORE_MAX_MB
+from util.storage import dataset_files, read_manifest, relative_path, scan_table
+
+# Columns read by any calculation (None = all); the rest stays on disk
+STORE_COLUMNS: dict[str, list[str] | None] = {
+    "fpp_estimations": ["user_id", "room_id", "estimation", "estimated_at"],
+    "fpp_events": ["user_id", "event", "event_at"],
+    "fpp_page_views": ["user_id", "route", "source", "room_id", "viewed_at"],
+    "fpp_rooms": None,
+    "fpp_votes": None,
+    "fpp_users": ["device", "os", "browser", "country", "region", "city", "created_at"],
+}
+
+Version = tuple[str, ...]
+
+# {table: (version, frame)} in least recently used order
+_tables: OrderedDict[str, tuple[Version, pl.DataFrame]] = OrderedDict()
+_store_lock = threading.Lock()
+_load_locks: dict[str, threading.Lock] = {t: threading.Lock() for t in STORE_COLUMNS}
+
+# {(table, column): (version, row numbers ordered by column, column in that order)}
+TableIndex = tuple[Version, pl.Series, pl.Series]
+_indexes: dict[tuple[str, str], TableIndex] = {}
+_index_lock = threading.Lock()
+
+
+def table_version(table: str) -> tuple[Version, dict[str, Any] | None]:
+    """Identify the table's current snapshot by its segment and delta list."""
+    manifest = read_manifest(table)
+    if manifest is None:
+        files = [relative_path(table, f) for f in dataset_files(table)]
+        return tuple(files), None
+    return tuple(manifest["files"] + manifest["deltas"]), manifest
+
+
+def _cached(table: str, version: Version) -> pl.DataFrame | None:
+    """Return the stored frame if it matches the version (and mark it used)."""
+    with _store_lock:
+        entry = _tables.get(table)
+        if entry is None or entry[0] != version:
+            return None
+        _tables.move_to_end(table)
+        return entry[1]
+
+
+def _stored_bytes() -> float:
+    """Memory held by stored tables and their indexes (caller holds the lock)."""
+    return sum(frame.estimated_size() for _, frame in _tables.values()) + sum(
+        order.estimated_size() + keys.estimated_size()
+        for _, order, keys in _indexes.values()
+    )
+
+
+def _drop(table: str) -> None:
+    """Forget a table and its indexes (caller holds the lock)."""
+    _tables.pop(table, None)
+    for key in [key for key in _indexes if key[0] == table]:
+        del _indexes[key]
+
+
+def _evict(max_bytes: int) -> None:
+    """Drop least recently used tables until the store fits (caller holds the lock)."""
+    while _tables and _stored_bytes() > max_bytes:
+        _drop(next(iter(_tables)))
+
+
+def _store(table: str, version: Version, df: pl.DataFrame) -> None:
+    """Keep a loaded frame, evicting least recently used tables over the cap."""
+    max_bytes = TABLE_STORE_MAX_MB * 1024 * 1024
+    with _store_lock:
+        _drop(table)
+        if df.estimated_size() > max_bytes:
+            return
+        _tables[table] = (version, df)
+        _evict(max_bytes)
+
+
+def get_versioned_table(table: str) -> tuple[Version, pl.DataFrame]:
+    """Return (version, data) of a table, loading it at most once per version."""
+    version, manifest = table_version(table)
+    df = _cached(table, version)
+    if df is not None:
+        return version, df
+
+    # One loader per table; concurrent sections wait for it instead of scanning
+    with _load_locks[table]:
+        df = _cached(table, version)
+        if df is not None:
+            return version, df
+        lf = scan_table(table, manifest)
+        columns = STORE_COLUMNS[table]
+        if columns is not None:
+            lf = lf.select(columns)
+        df = lf.collect()
+        _store(table, version, df)
+        return version, df
+
+
+def get_table(table: str) -> pl.DataFrame:
+    """Return the current data of a table, loading it at most once per version."""
+    return get_versioned_table(table)[1]
+
+
+def lazy_table(table: str) -> pl.LazyFrame:
+    """Lazy frame over the stored table, a drop-in for `scan_table`."""
+    return get_table(table).lazy()
+
+
+def get_table_index(
+    table: str, column: str
+) -> tuple[Version, pl.DataFrame, TableIndex | None]:
+    """Return (version, data, index) of a table; the index on column is
+    (version, row order, sorted keys).
+
+    Built once per table version and kept while the table is stored. Tables too
+    large for the store get no index (None), as it could not be kept either.
+    """
+    version, df = get_versioned_table(table)
+    with _index_lock:
+        with _store_lock:
+            stored = _tables.get(table)
+            entry = _indexes.get((table, column))
+        if stored is None or stored[0] != version:
+            return version, df, None
+        if entry is not None and entry[0] == version:
+            return version, df, entry
+
+        order = df[column].arg_sort()
+        entry = (version, order, df[column].gather(order))
+        with _store_lock:
+            stored = _tables.get(table)
+            if stored is not None and stored[0] == version:
+                _indexes[(table, column)] = entry
+                _evict(TABLE_STORE_MAX_MB * 1024 * 1024)
+        return version, df, entry
+
+
+def lookup_rows(table: str, column: str, key: Any) -> tuple[Version, pl.DataFrame]:
+    """Return (version, rows of the table whose column equals key) via its index."""
+    version, df, index = get_table_index(table, column)
+    if index is None:
+        return version, df.filter(pl.col(column) == key)
+    _, order, keys = index
+    start = keys.search_sorted(key, side="left")
+    end = keys.search_sorted(key, side="right")
+    return version, df[order.slice(start, end - start)]